@@ -0,0 +1,116 @@
+import argparse
+import multiprocessing
+import os
+import time
+
+from checker7 import Checker, Rules, load_persons, load_spec
+from shard7 import check_parallel
+
+#########################################
+# shard7.py 与 checker7.py 的耗时对比
+#   - 实测：真实进程池的墙钟时间，只有多核机器上才能体现加速；
+#   - 关键路径：在本进程内依次运行各任务并计时（CPU 时间），
+#     以 父进程 + 最慢的切分任务 + 检验任务在 N 个进程上的调度时长 估计 N 核时的耗时，不含进程间传输。
+#########################################
+def make_log(passengers, elevators=6):
+    """生成一份合法的长输出：各电梯轮流在 F1、F2 间各运送一名乘客"""
+    stdin_lines = []
+    events = []
+    floors = ["F1", "F2"]
+    at = [0] * elevators
+    for k in range(passengers):
+        pid = k + 1
+        e = k % elevators
+        eid = e + 1
+        a, b = floors[at[e]], floors[1 - at[e]]
+        base = 1.0 + (k // elevators) * 2.0 + e * 0.01
+        stdin_lines.append(f"[{base:.2f}]{pid}-PRI-5-FROM-{a}-TO-{b}\n")
+        for dt, s in ((0.05, f"RECEIVE-{pid}-{eid}"), (0.1, f"OPEN-{a}-{eid}"), (0.15, f"IN-{pid}-{a}-{eid}"),
+                      (0.55, f"CLOSE-{a}-{eid}"), (0.95, f"ARRIVE-{b}-{eid}"), (1.0, f"OPEN-{b}-{eid}"),
+                      (1.05, f"OUT-S-{pid}-{b}-{eid}"), (1.45, f"CLOSE-{b}-{eid}")):
+            events.append((base + dt, s))
+        at[e] = 1 - at[e]
+    events.sort(key=lambda event: event[0])
+    return stdin_lines, "".join(f"[{tick:10.4f}]{s}\n" for tick, s in events)
+
+
+def run_sequential(stdin_lines, text, spec):
+    start = time.process_time()
+    checker = Checker(load_persons(stdin_lines, Rules(spec)), spec)
+    for line in text.splitlines():
+        checker.feed_line(line)
+    result = checker.finish()
+    return time.process_time() - start, result
+
+
+def schedule(durations, workers):
+    """按提交顺序把任务交给最先空闲的进程（与 Pool.map 一致），返回全部完成的时刻"""
+    free = [0.0] * workers
+    for d in durations:
+        i = free.index(min(free))
+        free[i] += d
+    return max(free)
+
+
+def critical_path(stdin_lines, text, spec, jobs):
+    """返回 (估计耗时, 父进程, 最慢的切分任务, 检验任务调度时长, 结果)"""
+    durations = {}
+
+    def timed_map(fn, tasks):
+        results = []
+        for task in tasks:
+            start = time.process_time()
+            results.append(fn(task))
+            durations.setdefault(fn.__name__, []).append(time.process_time() - start)
+        return results
+
+    start = time.process_time()
+    outcome = check_parallel(stdin_lines, text, spec, jobs, timed_map)
+    total = time.process_time() - start
+    parent = total - sum(sum(d) for d in durations.values())
+    split = schedule(durations["split_chunk"], jobs)
+    check = schedule(durations["check_shard"], jobs)
+    return parent + split + check, parent, split, check, outcome
+
+
+def run_pool(stdin_lines, text, spec, jobs):
+    start = time.perf_counter()
+    if jobs == 1:
+        outcome = check_parallel(stdin_lines, text, spec)
+    else:
+        with multiprocessing.Pool(jobs) as pool:
+            outcome = check_parallel(stdin_lines, text, spec, jobs, pool.map)
+    return time.perf_counter() - start, outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比 shard7.py 与 checker7.py 检验同一份长输出的耗时")
+    parser.add_argument('--passengers', type=int, default=60000,
+                        help="生成的乘客数，每名乘客 8 行输出；指定 --dir 时不生成")
+    parser.add_argument('--dir', default=None, help="改为检验该目录下的 stdin.txt 与 stdout.txt")
+    parser.add_argument('--jobs', default="1,2,4,8,16", help="要测试的进程数，逗号分隔")
+    parser.add_argument('--repeat', type=int, default=3, help="每项重复次数，取最小值")
+    args = parser.parse_args()
+    spec = load_spec()
+    if args.dir:
+        with open(os.path.join(args.dir, "stdin.txt"), "r") as f:
+            stdin_lines = f.readlines()
+        with open(os.path.join(args.dir, "stdout.txt"), "r") as f:
+            text = f.read()
+    else:
+        stdin_lines, text = make_log(args.passengers, spec["elevators"])
+
+    print(f"输出 {text.count(chr(10))} 行，乘客 {len(stdin_lines)} 名，本机 CPU 核数 {os.cpu_count()}")
+    sequential = min(run_sequential(stdin_lines, text, spec)[0] for _ in range(args.repeat))
+    print(f"checker7 顺序检验: {sequential:.2f}s")
+    print("jobs\t实测\t关键路径\t(父进程 + 切分 + 检验)\t估计加速比")
+    for jobs in map(int, args.jobs.split(",")):
+        wall = min(run_pool(stdin_lines, text, spec, jobs)[0] for _ in range(args.repeat))
+        path, parent, split, check, _ = min((critical_path(stdin_lines, text, spec, jobs) for _ in range(args.repeat)),
+                                            key=lambda r: r[0])
+        print(f"{jobs}\t{wall:.2f}s\t{path:.2f}s\t\t({parent:.2f} + {split:.2f} + {check:.2f})"
+              f"\t\t{sequential / path:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,550 @@
+import argparse
+import base64
+import hmac
+import inspect
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import shlex
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pipeline7 import DEFAULT_COMMAND, DEFAULT_TIMEOUT, ROOT, run_checker, run_pipeline
+
+GENERATOR = os.path.join(ROOT, "generator7.py")
+DEFAULT_QUEUE = "sqlite:///campaign.db"
+DEFAULT_LEASE = 300  # 租约时长（秒），须明显长于单轮评测时间
+DEFAULT_ATTEMPTS = 3  # 每个任务最多被领取的次数
+TOKEN_HEADER = "X-Campaign-Token"  # serve 的共享口令，未设置 --token 时不校验
+RETRY_DELAYS = (1, 2, 5, 10, 30, 60)  # 访问队列失败后的重试间隔（秒），之后按最后一项重复
+RESULT_RETRIES = len(RETRY_DELAYS)  # 回传结果的最多重试次数，放弃后由租约过期让任务重新排队
+ARTIFACTS = ("stdin.txt", "out.txt", "checker.txt")  # 失败时回传的文件
+METRICS = re.compile(r'Accepted\t运行时间: ([\d.]+)s\t等待时间: ([\d.]+)s\t耗电量: ([\d.]+)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    seed INTEGER NOT NULL,
+    gen_args TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending / leased / done / dead
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_until);
+CREATE TABLE IF NOT EXISTS results (
+    job_id INTEGER PRIMARY KEY,
+    worker TEXT NOT NULL,
+    verdict TEXT NOT NULL,  -- accepted / wrong / timeout / generator_error
+    run_time REAL,
+    wait_time REAL,
+    power REAL,
+    elapsed REAL NOT NULL,
+    detail TEXT
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    job_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    data BLOB NOT NULL,  -- zlib 压缩
+    PRIMARY KEY (job_id, name)
+);
+"""
+
+
+#########################################
+# 任务队列：后端需实现以下方法，见 SQLiteQueue / HttpQueue
+#   submit(seeds, gen_args, max_attempts) -> 新增任务数
+#   lease(worker, lease_seconds) -> 任务 dict 或 None
+#   heartbeat(job_id, worker, lease_seconds) -> 是否仍持有租约
+#   complete(job_id, worker, result, artifacts) -> 结果是否被采纳
+#   fail(job_id, worker, error) -> 任务重新排队（超过次数则标记为 dead）
+#   remaining() -> 尚未结束（pending 或 leased）的任务数
+#   stats() / failures() / artifacts(job_id)
+#########################################
+class SQLiteQueue:
+    """
+    默认后端：SQLite 文件，供同一台机器上的进程共享。
+    NFS、SMB 等网络文件系统上的 SQLite 文件锁并不可靠，多台机器应由 `serve` 经 HTTP 暴露给其他主机。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _transaction(self, fn):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+        finally:
+            conn.close()
+
+    def submit(self, seeds, gen_args, max_attempts=DEFAULT_ATTEMPTS):
+        rows = [(seed, json.dumps(gen_args), max_attempts) for seed in seeds]
+        self._transaction(lambda conn: conn.executemany(
+            "INSERT INTO jobs (seed, gen_args, max_attempts) VALUES (?, ?, ?)", rows))
+        return len(rows)
+
+    def lease(self, worker, lease_seconds=DEFAULT_LEASE):
+        def take(conn):
+            now = time.time()
+            # 租约过期的任务视为其 worker 已失联，次数用尽则不再重试
+            conn.execute("UPDATE jobs SET status = 'dead', error = '租约过期且重试次数用尽' "
+                         "WHERE status = 'leased' AND lease_until < ? AND attempts >= max_attempts", (now,))
+            row = conn.execute("SELECT * FROM jobs WHERE status = 'pending' "
+                               "OR (status = 'leased' AND lease_until < ?) ORDER BY id LIMIT 1",
+                               (now,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = 'leased', worker = ?, lease_until = ?, "
+                         "attempts = attempts + 1 WHERE id = ?", (worker, now + lease_seconds, row["id"]))
+            return {"id": row["id"], "seed": row["seed"], "gen_args": json.loads(row["gen_args"]),
+                    "attempt": row["attempts"] + 1}
+        return self._transaction(take)
+
+    def heartbeat(self, job_id, worker, lease_seconds=DEFAULT_LEASE):
+        def extend(conn):
+            cur = conn.execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? "
+                               "AND status = 'leased'", (time.time() + lease_seconds, job_id, worker))
+            return cur.rowcount == 1
+        return self._transaction(extend)
+
+    def complete(self, job_id, worker, result, artifacts=None):
+        def store(conn):
+            # 租约过期后任务可能已被他人完成，只采纳第一份结果
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["status"] == "done":
+                return False
+            conn.execute("UPDATE jobs SET status = 'done', worker = ?, lease_until = NULL WHERE id = ?",
+                         (worker, job_id))
+            conn.execute("INSERT OR REPLACE INTO results (job_id, worker, verdict, run_time, wait_time, "
+                         "power, elapsed, detail) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (job_id, worker, result["verdict"], result.get("run_time"), result.get("wait_time"),
+                          result.get("power"), result["elapsed"], result.get("detail")))
+            for name, data in (artifacts or {}).items():
+                conn.execute("INSERT OR REPLACE INTO artifacts (job_id, name, data) VALUES (?, ?, ?)",
+                             (job_id, name, zlib.compress(data)))
+            return True
+        return self._transaction(store)
+
+    def fail(self, job_id, worker, error):
+        def release(conn):
+            conn.execute("UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN 'dead' "
+                         "ELSE 'pending' END, worker = NULL, lease_until = NULL, error = ? "
+                         "WHERE id = ? AND worker = ? AND status = 'leased'", (error, job_id, worker))
+        self._transaction(release)
+
+    def remaining(self):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'leased')").fetchone()[0]
+        finally:
+            conn.close()
+
+    def stats(self):
+        conn = self._connect()
+        try:
+            jobs = {r["status"]: r["n"] for r in
+                    conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
+            verdicts = {r["verdict"]: r["n"] for r in
+                        conn.execute("SELECT verdict, COUNT(*) AS n FROM results GROUP BY verdict")}
+            row = conn.execute("SELECT AVG(run_time) AS run_time, AVG(wait_time) AS wait_time, "
+                               "AVG(power) AS power FROM results "
+                               "WHERE verdict = 'accepted'").fetchone()
+            return {"jobs": jobs, "verdicts": verdicts, "accepted_mean": dict(row)}
+        finally:
+            conn.close()
+
+    def failures(self):
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT j.id, j.seed, j.gen_args, j.status, j.error, r.verdict, r.worker, "
+                                "r.detail FROM jobs j LEFT JOIN results r ON r.job_id = j.id "
+                                "WHERE j.status = 'dead' OR (r.verdict IS NOT NULL AND r.verdict != 'accepted') "
+                                "ORDER BY j.id").fetchall()
+            return [dict(r) for r in rows]
+        finally:
+            conn.close()
+
+    def artifacts(self, job_id):
+        conn = self._connect()
+        try:
+            return {r["name"]: zlib.decompress(r["data"]) for r in
+                    conn.execute("SELECT name, data FROM artifacts WHERE job_id = ?", (job_id,))}
+        finally:
+            conn.close()
+
+
+class HttpQueue:
+    """经 `campaign7.py serve` 访问远端队列，供不共享文件系统的主机使用"""
+
+    def __init__(self, url, token=None):
+        self.url = url.rstrip("/")
+        self.token = token
+
+    def _call(self, method, **kwargs):
+        body = json.dumps(kwargs).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers[TOKEN_HEADER] = self.token
+        req = urllib.request.Request(f"{self.url}/{method}", data=body, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                return json.loads(resp.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            # 服务端以 JSON 返回出错原因，附在异常信息中
+            try:
+                e.msg = json.loads(e.read().decode("utf-8"))["error"]
+            except (ValueError, KeyError, TypeError):
+                pass
+            raise
+
+    def submit(self, seeds, gen_args, max_attempts=DEFAULT_ATTEMPTS):
+        return self._call("submit", seeds=list(seeds), gen_args=gen_args, max_attempts=max_attempts)
+
+    def lease(self, worker, lease_seconds=DEFAULT_LEASE):
+        return self._call("lease", worker=worker, lease_seconds=lease_seconds)
+
+    def heartbeat(self, job_id, worker, lease_seconds=DEFAULT_LEASE):
+        return self._call("heartbeat", job_id=job_id, worker=worker, lease_seconds=lease_seconds)
+
+    def complete(self, job_id, worker, result, artifacts=None):
+        encoded = {name: base64.b64encode(data).decode("ascii") for name, data in (artifacts or {}).items()}
+        return self._call("complete", job_id=job_id, worker=worker, result=result, artifacts=encoded)
+
+    def fail(self, job_id, worker, error):
+        return self._call("fail", job_id=job_id, worker=worker, error=error)
+
+    def remaining(self):
+        return self._call("remaining")
+
+    def stats(self):
+        return self._call("stats")
+
+    def failures(self):
+        return self._call("failures")
+
+    def artifacts(self, job_id):
+        encoded = self._call("artifacts", job_id=job_id)
+        return {name: base64.b64decode(data) for name, data in encoded.items()}
+
+
+# 队列地址的 scheme -> 后端；新增后端只需在此注册
+BACKENDS = {
+    "sqlite": lambda url, token: SQLiteQueue(url[len("sqlite:///"):]),
+    "http": HttpQueue,
+    "https": HttpQueue,
+}
+
+
+def open_queue(url, token=None):
+    """
+    按地址打开队列，如 sqlite:///campaign.db、http://host:8765；不带 scheme 时视为 SQLite 文件路径。
+    token 为 serve 的共享口令，只对 HTTP 后端有意义。
+    """
+    scheme, sep, _ = url.partition("://")
+    if not sep:
+        return SQLiteQueue(url)
+    if scheme not in BACKENDS:
+        raise ValueError(f"未知的队列后端：{scheme}")
+    return BACKENDS[scheme](url, token)
+
+
+#########################################
+# 协调端：经 HTTP 暴露队列
+#########################################
+def serve(queue, host, port, token=None):
+    methods = ("submit", "lease", "heartbeat", "complete", "fail", "remaining", "stats", "failures", "artifacts")
+
+    class Handler(BaseHTTPRequestHandler):
+        def reply(self, code, result):
+            body = json.dumps(result, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            method = self.path.strip("/")
+            if method not in methods:
+                self.reply(404, {"error": f"未知方法：{method}"})
+                return
+            if token and not hmac.compare_digest(self.headers.get(TOKEN_HEADER, ""), token):
+                self.reply(403, {"error": "口令错误"})
+                return
+            fn = getattr(queue, method)
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                kwargs = json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+                if method == "complete":
+                    kwargs["artifacts"] = {name: base64.b64decode(data)
+                                           for name, data in kwargs.get("artifacts", {}).items()}
+                # 参数与队列方法不符（如工作端与协调端版本不一致）时重试也不会成功
+                inspect.signature(fn).bind(**kwargs)
+            except (ValueError, AttributeError, TypeError) as e:
+                self.reply(400, {"error": f"请求格式错误：{e}"})
+                return
+            try:
+                result = fn(**kwargs)
+                if method == "artifacts":
+                    result = {name: base64.b64encode(data).decode("ascii") for name, data in result.items()}
+            except Exception as e:
+                # 如数据库被锁超时；工作端收到 5xx 后会退避重试
+                self.reply(500, {"error": f"{type(e).__name__}: {e}"})
+                return
+            self.reply(200, result)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"队列服务已启动：http://{host}:{port}" + ("" if token else "（未设置口令）"))
+    server.serve_forever()
+
+
+#########################################
+# 工作端：领取任务 -> 生成数据 -> 运行评测管道 -> 检验 -> 回传结果
+#########################################
+def run_job(job, workdir, command, timeout):
+    """在 workdir 中完成一轮评测，返回 (结果, 失败时回传的文件)"""
+    start = time.time()
+    os.makedirs(workdir, exist_ok=True)
+    for name in ARTIFACTS + ("stdout.txt",):
+        path = os.path.join(workdir, name)
+        if os.path.exists(path):
+            os.remove(path)
+    gen = subprocess.run([sys.executable, GENERATOR, "--seed", str(job["seed"]), *job["gen_args"]],
+                         cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                         encoding="utf-8", errors="replace")
+    if gen.returncode != 0:
+        detail = gen.stdout.strip()
+        return ({"verdict": "generator_error", "elapsed": time.time() - start, "detail": detail},
+                {"checker.txt": detail.encode("utf-8")})
+
+    status = run_pipeline(workdir, command, timeout)
+    accepted, output = run_checker(workdir)
+    result = {"elapsed": time.time() - start, "detail": output.splitlines()[-1] if output else ""}
+    m = METRICS.search(output)
+    if status == "ok" and accepted and m:
+        result.update(verdict="accepted", run_time=float(m.group(1)), wait_time=float(m.group(2)),
+                      power=float(m.group(3)))
+        return result, None
+
+    result["verdict"] = "timeout" if status == "timeout" else "wrong"
+    with open(os.path.join(workdir, "checker.txt"), "w", encoding="utf-8") as f:
+        f.write(f"pipeline: {status}\n{output}\n")
+    artifacts = {}
+    for name in ARTIFACTS:
+        path = os.path.join(workdir, name)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                artifacts[name] = f.read()
+    return result, artifacts
+
+
+def retry(worker, fn, *args, attempts=None):
+    """
+    调用队列方法，网络中断、服务端 5xx 或数据库被锁时按 RETRY_DELAYS 退避重试。
+    attempts 为 None 时一直重试，否则重试次数用尽后抛出最后一次的异常。
+    """
+    for i in itertools.count(1):
+        try:
+            return fn(*args)
+        except (OSError, sqlite3.Error) as e:
+            # 4xx（口令错误、请求格式错误）重试也不会成功
+            if isinstance(e, urllib.error.HTTPError) and e.code < 500:
+                raise
+            if attempts is not None and i >= attempts:
+                raise
+            delay = RETRY_DELAYS[min(i, len(RETRY_DELAYS)) - 1]
+            print(f"[{worker}] 访问队列失败（{fn.__name__}）：{e}，{delay}s 后重试")
+            time.sleep(delay)
+
+
+def worker_loop(queue_url, workdir, command=DEFAULT_COMMAND, timeout=DEFAULT_TIMEOUT,
+                lease_seconds=DEFAULT_LEASE, idle_exit=False, max_jobs=None, token=None):
+    """workdir 为上级目录，实际在其下的 主机名-进程号 子目录中评测，多个工作端共用同一目录也不会冲突"""
+    queue = open_queue(queue_url, token)
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+    workdir = os.path.join(workdir, worker)
+    poll = min(5.0, lease_seconds / 2)
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        job = retry(worker, queue.lease, worker, lease_seconds)
+        if job is None:
+            # 其他 worker 持有的任务可能因其失联而重新排队，全部结束后才退出
+            if idle_exit and retry(worker, queue.remaining) == 0:
+                break
+            time.sleep(poll)
+            continue
+
+        # 评测期间定期续租，worker 失联后租约过期，任务由其他 worker 重新领取
+        stop = threading.Event()
+
+        def keep_alive(job_id=job["id"]):
+            while not stop.wait(lease_seconds / 3):
+                try:
+                    queue.heartbeat(job_id, worker, lease_seconds)
+                except Exception:
+                    pass
+
+        beat = threading.Thread(target=keep_alive, daemon=True)
+        beat.start()
+        try:
+            result, artifacts = run_job(job, workdir, command, timeout)
+        except Exception as e:
+            stop.set()
+            print(f"[{worker}] 任务 {job['id']} 出错：{e}")
+            try:
+                retry(worker, queue.fail, job["id"], worker, f"{type(e).__name__}: {e}", attempts=RESULT_RETRIES)
+            except Exception as e:
+                print(f"[{worker}] 任务 {job['id']} 无法释放，等待租约过期：{e}")
+            continue
+        stop.set()
+        try:
+            accepted = retry(worker, queue.complete, job["id"], worker, result, artifacts, attempts=RESULT_RETRIES)
+        except Exception as e:
+            # 放弃本次结果，租约过期后任务由其他 worker 重新执行
+            print(f"[{worker}] 任务 {job['id']} 结果回传失败：{e}")
+            continue
+        if not accepted:
+            # 租约过期后任务已由其他 worker 完成
+            print(f"[{worker}] 任务 {job['id']} 结果未被采纳：已由其他 worker 完成")
+            continue
+        done += 1
+        print(f"[{worker}] 任务 {job['id']} (seed={job['seed']}) {result['verdict']} {result['elapsed']:.1f}s")
+
+
+def _local_worker(queue_url, workdir, command, timeout, lease_seconds, token):
+    worker_loop(queue_url, workdir, command, timeout, lease_seconds, idle_exit=True, token=token)
+
+
+#########################################
+# 命令行
+#########################################
+def print_report(queue):
+    stats = queue.stats()
+    print("任务状态:", json.dumps(stats["jobs"], ensure_ascii=False))
+    print("评测结果:", json.dumps(stats["verdicts"], ensure_ascii=False))
+    mean = stats["accepted_mean"]
+    if mean.get("run_time") is not None:
+        print(f"Accepted 平均\t运行时间: {mean['run_time']:.1f}s\t等待时间: {mean['wait_time']:.3f}s"
+              f"\t耗电量: {mean['power']:.1f}")
+    for f in queue.failures():
+        print(f"  任务 {f['id']} seed={f['seed']} 参数={f['gen_args']} "
+              f"{f['verdict'] or f['status']}: {f['detail'] or f['error']}")
+
+
+def export_failures(queue, out_dir):
+    for f in queue.failures():
+        dest = os.path.join(out_dir, f"job{f['id']}_seed{f['seed']}")
+        os.makedirs(dest, exist_ok=True)
+        for name, data in queue.artifacts(f["id"]).items():
+            with open(os.path.join(dest, name), "wb") as out:
+                out.write(data)
+        print(dest)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="多机分布式评测：协调端下发带种子的任务，工作端领取并回传结果")
+    parser.add_argument('--queue', default=DEFAULT_QUEUE,
+                        help="队列地址：sqlite:///文件 或 http://主机:端口")
+    parser.add_argument('--token', default=os.environ.get("CAMPAIGN7_TOKEN"),
+                        help="serve 的共享口令，工作端与协调端须一致（默认读取环境变量 CAMPAIGN7_TOKEN）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    submit = sub.add_parser("submit", help="下发任务")
+    submit.add_argument('--jobs', type=int, default=100, help="任务数")
+    submit.add_argument('--seed_base', type=int, default=0, help="第一个任务的种子，其后依次加一")
+    submit.add_argument('--gen_args', default="", help="传给 generator7.py 的参数，如 \"--num_updates 2\"")
+    submit.add_argument('--max_attempts', type=int, default=DEFAULT_ATTEMPTS, help="每个任务最多领取次数")
+
+    for name, help_text in (("worker", "作为工作端领取并执行任务"),
+                            ("local", "在本机启动多个工作端进程模拟多台机器")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument('--workdir', default="campaign_work",
+                       help="工作目录的上级目录，每个工作端使用其下的 主机名-进程号 子目录")
+        p.add_argument('--pipeline', default=DEFAULT_COMMAND, help="评测管道命令，{root} 为评测机所在目录")
+        p.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help="单轮评测超时时间（秒）")
+        p.add_argument('--lease', type=float, default=DEFAULT_LEASE, help="租约时长（秒）")
+    sub.choices["worker"].add_argument('--idle_exit', action="store_true", help="队列为空时退出")
+    sub.choices["worker"].add_argument('--max_jobs', type=int, default=None, help="最多执行的任务数")
+    sub.choices["local"].add_argument('--workers', type=int, default=os.cpu_count(), help="工作端进程数")
+
+    serve_parser = sub.add_parser("serve", help="经 HTTP 向其他主机暴露队列")
+    serve_parser.add_argument('--host', default="127.0.0.1",
+                              help="监听地址，向其他主机开放（如 0.0.0.0）时须设置 --token")
+    serve_parser.add_argument('--port', type=int, default=8765)
+
+    sub.add_parser("report", help="汇总评测结果")
+    export = sub.add_parser("export", help="导出失败任务的输入、输出与检验结果")
+    export.add_argument('--out', default="campaign_failures")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == "worker":
+        worker_loop(args.queue, args.workdir, args.pipeline, args.timeout, args.lease,
+                    idle_exit=args.idle_exit, max_jobs=args.max_jobs, token=args.token)
+        return
+    if args.command == "local":
+        open_queue(args.queue, args.token)  # 预先建表，避免各进程同时初始化
+        procs = [multiprocessing.Process(target=_local_worker,
+                                         args=(args.queue, args.workdir, args.pipeline, args.timeout,
+                                               args.lease, args.token))
+                 for _ in range(args.workers)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        print_report(open_queue(args.queue, args.token))
+        return
+
+    queue = open_queue(args.queue, args.token)
+    if args.command == "submit":
+        n = queue.submit(range(args.seed_base, args.seed_base + args.jobs), shlex.split(args.gen_args),
+                         args.max_attempts)
+        print(f"已下发 {n} 个任务")
+    elif args.command == "serve":
+        if not isinstance(queue, SQLiteQueue):
+            raise SystemExit("serve 只能暴露本地 SQLite 队列")
+        if not args.token and args.host not in ("127.0.0.1", "localhost", "::1"):
+            raise SystemExit("serve 没有访问控制，向其他主机开放时须用 --token 设置共享口令")
+        serve(queue, args.host, args.port, args.token)
+    elif args.command == "report":
+        print_report(queue)
+    elif args.command == "export":
+        export_failures(queue, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,220 @@
 #!/usr/bin/env python3
+import argparse
+import json
 import sys
-import re
 
 
 #########################################
-# 辅助函数及数据结构定义
+# 规则描述：楼层、电梯数、容量、速度及各类时限
+# 可通过 --spec 传入 JSON 文件覆盖其中任意项，以适配其他作业或楼宇规模
 #########################################
-def to_int(s: str):
-    """
-    将楼层字符串转换为数值：
-      - "B4" -> -4, "B1" -> -1；
-      - "F1" -> 0, "F7" -> 6。
-    """
-    if s[0] == "B":
+DEFAULT_SPEC = {
+    "floors": ["B4", "B3", "B2", "B1", "F1", "F2", "F3", "F4", "F5", "F6", "F7"],
+    "ground": "F1",  # 数值为 0 的楼层
+    "elevators": 6,  # 电梯数量
+    "capacity": 6,  # 轿厢容量
+    "move_time": 0.4,  # 普通状态下每层最小移动时间（s）
+    "update_move_time": 0.2,  # 改造中及改造后每层最小移动时间（s）
+    "door_time": 0.4,  # 开关门最小间隔（s）
+    "special_door_time": 1.0,  # SCHE/UPDATE 正式状态下开关门最小间隔（s）
+    "response_limit": 6.0,  # ACCEPT 到 END 的最长时间（s）
+    "update_time": 1.0,  # UPDATE-BEGIN 到 UPDATE-END 的最短时间（s）
+    "pre_arrive_limit": 2,  # ACCEPT 后、BEGIN 前最多 ARRIVE 次数
+    "move_tolerance": 0.01,  # 移动时间允许误差（s）
+    "time_tolerance": 0.0001,  # 其余时间判断允许误差（s）
+    "move_energy": 0.4,  # 普通状态每次 ARRIVE 耗电
+    "update_move_energy": 0.2,  # 改造中及改造后每次 ARRIVE 耗电
+    "door_energy": 0.1,  # 每次开门或关门耗电
+}
+
+# 输出命令表：下标即操作码。字段类型：F 楼层、E 电梯编号、P 乘客编号、S 速度
+OPCODES = (
+    ("ARRIVE", "FE"),
+    ("OPEN", "FE"),
+    ("CLOSE", "FE"),
+    ("RECEIVE", "PE"),
+    ("IN", "PFE"),
+    ("OUT-S", "PFE"),
+    ("OUT-F", "PFE"),
+    ("SCHE-ACCEPT", "ESF"),
+    ("SCHE-BEGIN", "E"),
+    ("SCHE-END", "E"),
+    ("UPDATE-ACCEPT", "EEF"),
+    ("UPDATE-BEGIN", "EE"),
+    ("UPDATE-END", "EE"),
+)
+OPCODE_OF = {name: op for op, (name, _) in enumerate(OPCODES)}
+UPDATE_OPS = OPCODE_OF["UPDATE-ACCEPT"]  # 此后的操作码均为 UPDATE 命令，前两个字段是 A、B 电梯
+
+# 输出格式错误时的报错：命令 -> (参数不足, {字段类型: 字段无法解析})，字段按字典中的次序检查
+MOVE_ERRORS = ("输出格式错误，不足参数", "输出中电梯编号格式错误")
+PARSE_ERRORS = {
+    "ARRIVE": (MOVE_ERRORS[0], {"E": MOVE_ERRORS[1], "F": "无法解析 ARRIVE 楼层"}),
+    "OPEN": (MOVE_ERRORS[0], {"E": MOVE_ERRORS[1], "F": "无法解析 OPEN 楼层"}),
+    "CLOSE": (MOVE_ERRORS[0], {"E": MOVE_ERRORS[1], "F": "无法解析 CLOSE 楼层"}),
+    "RECEIVE": ("RECEIVE 格式错误", {"P": "RECEIVE 中数字格式错误", "E": "RECEIVE 中数字格式错误"}),
+    "IN": ("IN 格式错误", {"P": "IN 中数字格式错误", "F": "IN 中楼层格式错误", "E": "IN 中数字格式错误"}),
+    "OUT-S": ("OUT 格式错误", {"P": "OUT 中乘客ID格式错误", "F": "OUT 中楼层格式错误", "E": "OUT 中电梯ID格式错误"}),
+    "OUT-F": ("OUT 格式错误", {"P": "OUT 中乘客ID格式错误", "F": "OUT 中楼层格式错误", "E": "OUT 中电梯ID格式错误"}),
+    "SCHE-ACCEPT": ("SCHE-ACCEPT 格式错误", {"E": "SCHE-ACCEPT 数字字段错误", "S": "SCHE-ACCEPT 数字字段错误",
+                                         "F": "SCHE-ACCEPT 目标楼层格式错误"}),
+    "SCHE-BEGIN": ("SCHE-BEGIN 格式错误", {"E": "SCHE-BEGIN 电梯ID格式错误"}),
+    "SCHE-END": ("SCHE-END 格式错误", {"E": "SCHE-END 电梯ID格式错误"}),
+    "UPDATE-ACCEPT": ("UPDATE-ACCEPT 格式错误", {"E": "UPDATE-ACCEPT 电梯ID格式错误",
+                                             "F": "UPDATE-ACCEPT 目标楼层格式错误"}),
+    "UPDATE-BEGIN": ("UPDATE-BEGIN 格式错误", {"E": "UPDATE-BEGIN 电梯ID格式错误"}),
+    "UPDATE-END": ("UPDATE-END 格式错误", {"E": "UPDATE-END 电梯ID格式错误"}),
+}
+
+NEAR_MARGIN = 0.01  # 距离阈值 10ms 以内视为“险些违例”
+
+
+class ParseError(ValueError):
+    def __init__(self, msg, tick=None):
+        super().__init__(msg)
+        self.tick = tick
+
+
+class Rules:
+    """由规则描述编译得到的常量及字段解析器"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        floors = spec["floors"]
+        ground = floors.index(spec["ground"])
+        self.floor_of = {name: i - ground for i, name in enumerate(floors)}
+        self.floor_name = {i - ground: name for i, name in enumerate(floors)}
+        self.base = -ground
+        self.top = len(floors) - 1 - ground
+        self.elevators = spec["elevators"]
+        self.capacity = spec["capacity"]
+        self.move_time = spec["move_time"]
+        self.update_move_time = spec["update_move_time"]
+        self.door_time = spec["door_time"]
+        self.special_door_time = spec["special_door_time"]
+        self.response_limit = spec["response_limit"]
+        self.update_time = spec["update_time"]
+        self.pre_arrive_limit = spec["pre_arrive_limit"]
+        self.move_tolerance = spec["move_tolerance"]
+        self.time_tolerance = spec["time_tolerance"]
+        self.move_energy = spec["move_energy"]
+        self.update_move_energy = spec["update_move_energy"]
+        self.door_energy = spec["door_energy"]
+
+        converters = {"F": self.floor, "E": self.elevator, "P": int, "S": float}
+        formatters = {"F": self.floor_name.__getitem__, "E": lambda eid: str(eid + 1),
+                      "P": str, "S": lambda spd: f"{spd:g}"}
+        # 操作码 -> 各字段的解析函数及格式化函数
+        self.parsers = [tuple(converters[kind] for kind in fields) for _, fields in OPCODES]
+        self.formatters = [tuple(formatters[kind] for kind in fields) for _, fields in OPCODES]
+
+    def floor(self, s: str):
+        """将楼层字符串转换为数值，如 "B4" -> -4, "F1" -> 0, "F7" -> 6"""
         try:
-            return -int(s[1])
-        except:
-            return None
-    else:
+            return self.floor_of[s]
+        except KeyError:
+            raise ValueError(f"未知楼层 {s}")
+
+    def elevator(self, s: str):
+        """将电梯编号（1 起）转换为下标（0 起）"""
+        eid = int(s) - 1
+        if eid < 0 or eid >= self.elevators:
+            raise ValueError(f"电梯编号超界 {s}")
+        return eid
+
+    def parse_line(self, data):
+        """将一行输出解析为 (时间戳, 操作码, 字段)，格式错误时抛出 ParseError"""
+        i = data.find("]")
+        try:
+            if data[0] != "[" or i < 0:
+                raise ValueError
+            tick = float(data[1:i])
+        except ValueError:
+            raise ParseError("无法解析时间戳")
+        args = data[i + 1:].strip().split("-")
+        op = OPCODE_OF.get(args[0])
+        nfix = 1
+        if op is None:
+            op = OPCODE_OF.get("-".join(args[:2]))
+            nfix = 2
+        if op is None:
+            raise ParseError(self.unknown_error(args), tick)
+        parsers = self.parsers[op]
+        if len(args) - nfix != len(parsers):
+            name = OPCODES[op][0]
+            if len(args) - nfix < len(parsers):
+                raise ParseError(PARSE_ERRORS[name][0], tick)
+            raise ParseError(f"{name} 格式错误", tick)
         try:
-            return int(s[1:]) - 1
-        except:
-            return None
+            fields = [parse(s) for parse, s in zip(parsers, args[nfix:])]
+        except ValueError:
+            raise ParseError(self.field_error(op, args[nfix:]), tick)
+        if op >= UPDATE_OPS and fields[0] == fields[1]:
+            raise ParseError(f"{OPCODES[op][0]} 中 A、B 电梯编号相同", tick)
+        return tick, op, fields
+
+    @staticmethod
+    def unknown_error(args):
+        """未知命令的报错，与逐条解析时一致"""
+        if args[0] == "OUT":
+            return "OUT 格式错误"
+        if args[0] in ("SCHE", "UPDATE"):
+            if len(args) < 2:
+                return f"{args[0]} 格式错误"
+            return f"未知输出命令: {args[0]}-{args[1]}"
+        if len(args) < 3:
+            return MOVE_ERRORS[0]
+        return f"未知输出命令: {args[0]}"
+
+    def field_error(self, op, args):
+        """找出第一个无法解析的字段，返回对应的报错"""
+        name, kinds = OPCODES[op]
+        messages = PARSE_ERRORS[name][1]
+        for kind in messages:
+            for k, parse, s in zip(kinds, self.parsers[op], args):
+                if k != kind:
+                    continue
+                try:
+                    parse(s)
+                except ValueError:
+                    return "电梯编号超界" if kind == "E" and s.isdigit() else messages[kind]
+        return f"{name} 格式错误"
+
+    def format_event(self, tick, op, fields):
+        """parse_line 的逆过程"""
+        args = [fmt(x) for fmt, x in zip(self.formatters[op], fields)]
+        return f"[{tick:10.4f}]" + "-".join([OPCODES[op][0]] + args)
+
+
+def load_spec(path=None):
+    spec = dict(DEFAULT_SPEC)
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            spec.update(json.load(f))
+    return spec
 
 
+#########################################
+# 辅助数据结构定义
+#########################################
 class Person:
-    def __init__(self, s: str):
+    def __init__(self, pid, priority, send_tick, start, end):
+        self.send_tick = send_tick
+        self.id = pid
+        self.priority = priority
+        self.cur = start
+        self.start = start
+        self.end = end
+        self.eid = None  # 分配到的电梯编号（0 起），None 表示未分配
+        self.arrive_tick = 0.0
+
+    @classmethod
+    def parse(cls, s: str, rules: Rules):
         # 格式：[时间戳]乘客ID-PRI-优先级-FROM-起点层-TO-终点层
         i = s.find("]")
-        self.send_tick = float(s[1:i].strip())
         args = s[(i + 1):].split("-")
-        self.id = int(args[0])
-        self.priority = int(args[2])
-        self.cur = to_int(args[4])
-        self.end = to_int(args[6])
-        self.eid = None  # 分配到的电梯编号（0~5），None 表示未分配
-        self.arrive_tick = 0.0
+        return cls(int(args[0]), int(args[2]), float(s[1:i].strip()),
+                   rules.floor(args[4]), rules.floor(args[6]))
 
     def __hash__(self):
         return self.id.__hash__()
@@ -48,39 +227,67 @@ class Person:
 
 
 class Elevator:
-    def __init__(self, eid: int):
-        # eid: 0~5，对应电梯编号1~6
+    def __init__(self, eid: int, rules: Rules):
+        # eid: 0 起，对应电梯编号 eid + 1
         self.eid = eid
         self.floor = 0
-        self.top = 6
-        self.base = -4
+        self.top = rules.top
+        self.base = rules.base
         self.is_close = True
-        self.peoples = set()  # 轿厢内乘客
+        self.peoples = set()  # 轿厢内乘客（乘客 id 集合）
         self.received = set()  # 当前 RECEIVE 分配（乘客 id 集合）
         self.last_action = None  # 上一次有效动作类型（如 ARRIVE, CLOSE, …）
         self.last_action_tick = 0.0
+        self.last_open_tick = 0.0
 
         # SCHE 相关：仅在正式状态（on_sche）时要求特殊检查，
         # 在收到 SCHE-ACCEPT时仅设置 pre_sche=True，并开始累计 ARRIVE 次数（不严格要求门间隔等）
         self.pre_sche = False  # 收到 SCHE-ACCEPT后，尚未进入正式 SCHE 状态
         self.on_sche = False  # 正式 SCHE 状态（SCHE-BEGIN到SCHE-END期间）
-        self.on_sche_speed = 0.4  # SCHE 时最小移动时间（s/层）
+        self.on_sche_speed = None  # SCHE 时最小移动时间（s/层），由 SCHE-ACCEPT 给出
         self.sche_target = None  # SCHE目标楼层（int）
         self.got_sche_tick = 0.0  # SCHE-ACCEPT 时间戳
-        self.sche_arrive_count = 0  # 仅在 pre_sche 状态下累计 ARRIVE 次数（≤2）
+        self.sche_arrive_count = 0  # 仅在 pre_sche 状态下累计 ARRIVE 次数
 
         # UPDATE 相关：同理，预状态与正式状态分开
         self.pre_update = False
         self.on_update = False
-        self.partner = None  # 搭档电梯编号（0~5）
+        self.partner = None  # 搭档电梯下标
         self.update_target = None
         self.got_update_tick = 0.0  # UPDATE-ACCEPT 时间戳
-        self.update_arrive_count = 0  # 仅在 pre_update 状态下累计 ARRIVE 次数（≤2）
+        self.update_arrive_count = 0  # 仅在 pre_update 状态下累计 ARRIVE 次数
         self.update_begin_tick = 0.0  # 记录 UPDATE-BEGIN 时间
 
         # 改造完成后状态（特殊状态结束后）
         self.after_update = False
-        self.movement_bounds = None  # UPDATE后运行范围
+
+        # 双轿厢同层检查所需状态的副本，只由 cross_* 读写：
+        # shard7.py 分片检验时 cross 部分看不到其他进程中 local_* 维护的 floor 等字段
+        self.cross_floor = 0
+        self.cross_target = None
+        self.cross_after_update = False
+
+    def mode(self):
+        # 当前所处状态，用于覆盖率统计
+        if self.on_sche:
+            return "on_sche"
+        if self.pre_sche:
+            return "pre_sche"
+        if self.on_update:
+            return "on_update"
+        if self.pre_update:
+            return "pre_update"
+        if self.after_update:
+            return "after_update"
+        return "normal"
+
+    def is_special(self):
+        # 正式特殊状态（SCHE 或 UPDATE 的 BEGIN 到 END 之间）
+        return (self.on_sche or self.on_update) and not self.after_update
+
+    def act(self, action, tick):
+        self.last_action = action
+        self.last_action_tick = tick
 
     def reset_sche(self):
         # 清除 SCHE 相关标志
@@ -89,8 +296,7 @@ class Elevator:
         self.sche_target = None
         self.got_sche_tick = 0.0
         self.sche_arrive_count = 0
-        self.on_sche_speed = 0.4
-        # 同时清空该电梯 RECEIVE（全局记录将在外部同步清除）
+        self.on_sche_speed = None
 
     def reset_update(self):
         self.on_update = False
@@ -101,504 +307,553 @@ class Elevator:
 
 
 #########################################
-# 辅助：清除全局 RECEIVE 中分配给某电梯的记录
-#########################################
-def clear_global_receive(eid):
-    remove_ids = [pid for pid, rid in receive_assign.items() if rid == eid]
-    for pid in remove_ids:
-        del receive_assign[pid]
-
-
+# 检验器：按操作码查表分发各输出命令
+# 每条命令的检查分为两部分：
+#   local_*：只涉及该命令所属电梯自身的状态（门、楼层、轿厢、特殊状态、耗电等）；
+#   cross_*：涉及多部电梯共享的状态（RECEIVE 分配、乘客位置、双轿厢同层）。
+# 顺序检验时先 local 后 cross；shard7.py 按电梯分片并行检验 local 部分，另起一路检验 cross 部分。
 #########################################
-# 全局状态及文件输入
-#########################################
-elevators = [Elevator(i) for i in range(6)]
-persons = {}
-stdin_lines = []
-try:
-    with open("stdin.txt", "r") as f:
-        stdin_lines = f.readlines()
-except Exception as e:
-    print("读取stdin.txt失败:", e)
-    sys.exit(1)
-
-for line in stdin_lines:
-    line = line.strip()
-    if not line:
-        continue
-    if "SCHE" in line or "UPDATE" in line:
-        continue
-    try:
-        p = Person(line)
-        if p.id in persons:
-            raise RuntimeError(f"重复的乘客请求：{p.id}")
-        persons[p.id] = p
-    except Exception as e:
-        print("解析乘客请求失败:", e)
-        sys.exit(1)
-
-# 全局 RECEIVE 记录：pid -> elevator id
-receive_assign = {}
-
-watt = 0.0
-last_output_tick = 0.0
-error_count = 0
-
-
-def error(msg, tick=None, line=None):
-    global error_count
-    error_count += 1
-    tstr = f" [ts={tick}]" if tick is not None else ""
-    lstr = f" [line: {line}]" if line is not None else ""
-    raise RuntimeError(f"错误: {msg}{tstr}{lstr}")
-
-
-#########################################
-# 处理 stdout.txt 输出日志
-#########################################
-try:
-    with open("stdout.txt", "r") as f:
-        stdout_lines = f.readlines()
-except Exception as e:
-    print("读取stdout.txt失败:", e)
-    sys.exit(1)
-
-for line in stdout_lines:
-    data = line.strip()
-    if not data:
-        continue
-    m = re.match(r'\[\s*([\d\.]+)\](.*)', data)
-    if not m:
-        error("无法解析时间戳", line=data)
-        continue
-    tick = float(m.group(1).strip())
-    if tick < last_output_tick:
-        error(f"时间戳不递增：{tick} < {last_output_tick}", tick, data)
-    last_output_tick = tick
-    content = m.group(2).strip()
-    args = content.split("-")
-    cmd = args[0]
-
-    # 对于非 SCHE/UPDATE/RECEIVE/IN/OUT 命令（即 ARRIVE, OPEN, CLOSE），采用最后两个参数解析：楼层、 电梯编号
-    if cmd not in ("SCHE", "UPDATE", "RECEIVE", "IN", "OUT"):
-        if len(args) < 3:
-            error("输出格式错误，不足参数", tick, data)
-            continue
-        fl = to_int(args[-2])
+class Checker:
+    PARTS = ("local", "cross")
+
+    def __init__(self, persons, spec=DEFAULT_SPEC):
+        self.rules = Rules(spec)
+        self.elevators = [Elevator(i, self.rules) for i in range(self.rules.elevators)]
+        self.owned = set(range(self.rules.elevators))  # 由本检验器负责 local 检查的电梯
+        self.persons = persons
+        self.receive_assign = {}  # 全局 RECEIVE 记录：pid -> elevator id
+        self.watt = 0.0
+        self.last_output_tick = 0.0
+        self.error_count = 0
+        self.coverage = set()
+        self.tick = None
+        self.line = None
+        self.op = None
+        self.fields = None
+        # 操作码 -> 处理函数，如 "SCHE-ACCEPT" -> local_sche_accept
+        self.handlers = [self.compile_handler(name) for name, _ in OPCODES]
+
+    def compile_handler(self, name):
+        key = name.lower().replace("-", "_")
+        parts = [getattr(self, f"{part}_{key}") for part in self.PARTS if hasattr(self, f"{part}_{key}")]
+        if not parts:
+            return lambda tick, *fields: None
+        if len(parts) == 1:
+            return parts[0]
+        local, cross = parts
+
+        def handler(tick, *fields):
+            local(tick, *fields)
+            cross(tick, *fields)
+        return handler
+
+    #########################################
+    # 错误与覆盖率记录
+    #########################################
+    def error(self, msg):
+        self.error_count += 1
+        line = self.line
+        if line is None and self.op is not None:
+            # 二进制 trace 没有原始文本，按字段还原
+            line = self.rules.format_event(self.tick, self.op, self.fields)
+        tstr = f" [ts={self.tick}]" if self.tick is not None else ""
+        lstr = f" [line: {line}]" if line is not None else ""
+        raise RuntimeError(f"错误: {msg}{tstr}{lstr}")
+
+    def cover(self, feature):
+        self.coverage.add(feature)
+
+    def near(self, feature, slack):
+        # slack 为距离违例阈值的余量，余量在 [0, NEAR_MARGIN] 内记为险些违例
+        if 0 <= slack <= NEAR_MARGIN:
+            self.cover("near:" + feature)
+
+    def transition(self, elev, action):
+        # 记录 “状态:上一动作>本次动作” 形式的状态转移
+        self.cover(f"{elev.mode()}:{elev.last_action}>{action}")
+
+    def dump_coverage(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for feature in sorted(self.coverage):
+                f.write(feature + "\n")
+
+    def clear_receive(self, eid):
+        # 清除全局 RECEIVE 中分配给某电梯的记录
+        remove_ids = [pid for pid, rid in self.receive_assign.items() if rid == eid]
+        for pid in remove_ids:
+            del self.receive_assign[pid]
+
+    #########################################
+    # 输入：文本行或已解析的 (时间戳, 操作码, 字段)
+    #########################################
+    def feed_line(self, line):
+        data = line.strip()
+        if not data:
+            return
         try:
-            eid = int(args[-1]) - 1
-        except:
-            error("输出中电梯编号格式错误", tick, data)
-            continue
-        if eid < 0 or eid >= len(elevators):
-            error("电梯编号超界", tick, data)
-            continue
-        elev = elevators[eid]
-    # 以下各分支分别处理各命令
-    # ------ ARRIVE ------
-    if cmd == "ARRIVE":
-        if fl is None:
-            error("无法解析 ARRIVE 楼层", tick, data)
-            continue
+            tick, op, fields = self.rules.parse_line(data)
+        except ParseError as e:
+            self.tick = e.tick
+            self.line = data
+            self.op = None
+            self.error(str(e))
+        self.feed(tick, op, fields, data)
+
+    def feed(self, tick, op, fields, line=None):
+        self.tick = tick
+        self.line = line
+        self.op = op
+        self.fields = fields
+        if tick < self.last_output_tick:
+            self.error(f"时间戳不递增：{tick} < {self.last_output_tick}")
+        self.last_output_tick = tick
+        self.handlers[op](tick, *fields)
+
+    #########################################
+    # 各命令处理函数
+    #########################################
+    def local_arrive(self, tick, fl, eid):
+        rules = self.rules
+        elev = self.elevators[eid]
+        self.transition(elev, "ARRIVE")
         if abs(fl - elev.floor) != 1:
-            error(f"电梯 {eid + 1} 移动超过一层，从 {elev.floor} 到 {fl}", tick, data)
+            self.error(f"电梯 {eid + 1} 移动超过一层，从 {elev.floor} 到 {fl}")
         if not elev.is_close:
-            error(f"电梯 {eid + 1} 在门开状态下移动", tick, data)
+            self.error(f"电梯 {eid + 1} 在门开状态下移动")
         # 仅在普通状态下检查空载：若电梯既无乘客又无 RECEIVE 且不处于预状态和特殊状态，则报错
         if (not (elev.pre_sche or elev.on_sche or elev.pre_update or elev.on_update or elev.after_update)) and (
                 len(elev.peoples) == 0 and len(elev.received) == 0):
-            error(f"电梯 {eid + 1} 为空且无 RECEIVE 却移动", tick, data)
+            self.error(f"电梯 {eid + 1} 为空且无 RECEIVE 却移动")
         # 仅在预状态（pre_sche, pre_update）下累计 ARRIVE 次数
         if elev.pre_sche:
             elev.sche_arrive_count += 1
-            if elev.sche_arrive_count > 2:
-                error(f"电梯 {eid + 1} SCHE 预状态下 ARRIVE 次数超过2", tick, data)
+            self.cover(f"ARRIVE.pre_sche_count={elev.sche_arrive_count}")
+            if elev.sche_arrive_count > rules.pre_arrive_limit:
+                self.error(f"电梯 {eid + 1} SCHE 预状态下 ARRIVE 次数超过{rules.pre_arrive_limit}")
         if elev.pre_update:
             elev.update_arrive_count += 1
-            if elev.update_arrive_count > 2:
-                error(f"电梯 {eid + 1} UPDATE 预状态下 ARRIVE 次数超过2", tick, data)
+            self.cover(f"ARRIVE.pre_update_count={elev.update_arrive_count}")
+            if elev.update_arrive_count > rules.pre_arrive_limit:
+                self.error(f"电梯 {eid + 1} UPDATE 预状态下 ARRIVE 次数超过{rules.pre_arrive_limit}")
         if elev.last_action in ("CLOSE", "ARRIVE"):
             dt = tick - elev.last_action_tick
             if elev.on_sche:
                 exp_speed = elev.on_sche_speed
             elif elev.on_update or elev.after_update:
-                exp_speed = 0.2
+                exp_speed = rules.update_move_time
             else:
-                exp_speed = 0.4
-            if dt < exp_speed - 0.01:
-                error(f"电梯 {eid + 1} 移动时间 {dt:.3f}s 小于最小要求 {exp_speed}s", tick, data)
-        elev.last_action = "ARRIVE"
-        elev.last_action_tick = tick
+                exp_speed = rules.move_time
+            self.near(f"ARRIVE.move_time@{elev.mode()}", dt - (exp_speed - rules.move_tolerance))
+            if dt < exp_speed - rules.move_tolerance:
+                self.error(f"电梯 {eid + 1} 移动时间 {dt:.3f}s 小于最小要求 {exp_speed}s")
+        elev.act("ARRIVE", tick)
         elev.floor = fl
-        if elev.after_update and elev.partner is not None:
-            partner = elevators[elev.partner]
-            if partner.after_update:
-                if elev.floor == partner.floor:
-                    error(f"双轿厢冲突：电梯 {eid + 1} 与 {partner.eid + 1} 同层 {elev.floor}", tick, data)
-        if fl > elev.top or fl < elev.base :
-            error(f"电梯 {eid + 1} 越界", tick, data)
+        if fl > elev.top or fl < elev.base:
+            self.error(f"电梯 {eid + 1} 越界")
         if elev.on_update or elev.after_update:
-            watt += 0.2
+            self.watt += rules.update_move_energy
         else:
-            watt += 0.4
-
-    # ------ OPEN ------
-    elif cmd == "OPEN":
-        if fl is None:
-            error("无法解析 OPEN 楼层", tick, data)
-            continue
+            self.watt += rules.move_energy
+
+    def cross_arrive(self, tick, fl, eid):
+        # 改造完成后与搭档不得同层
+        elev = self.elevators[eid]
+        if elev.cross_after_update and elev.partner is not None:
+            elev.cross_floor = fl
+            partner = self.elevators[elev.partner]
+            if partner.cross_after_update:
+                self.cover("ARRIVE.partner_check")
+                if abs(elev.cross_floor - partner.cross_floor) == 1:
+                    self.cover("near:ARRIVE.partner_adjacent")
+                if elev.cross_floor == partner.cross_floor:
+                    self.error(f"双轿厢冲突：电梯 {eid + 1} 与 {partner.eid + 1} 同层 {elev.cross_floor}")
+
+    def local_open(self, tick, fl, eid):
+        elev = self.elevators[eid]
         if elev.floor != fl:
-            error(f"电梯 {eid + 1} OPEN 楼层不符：实际 {elev.floor} 要求 {fl}", tick, data)
-            continue
-        # 如果处于正式特殊状态 (on_sche 或 on_update 且 not after_update)，OPEN 只允许在目标楼层
-        if ((elev.on_sche or elev.on_update) and (not elev.after_update)):
+            self.error(f"电梯 {eid + 1} OPEN 楼层不符：实际 {elev.floor} 要求 {fl}")
+        self.transition(elev, "OPEN")
+        # 如果处于正式特殊状态，OPEN 只允许在目标楼层
+        if elev.is_special():
             target = elev.sche_target if elev.on_sche else elev.update_target
             if fl != target:
-                error(f"电梯 {eid + 1} 在特殊状态下非目标楼层 OPEN", tick, data)
-        elev.last_action = "OPEN"
-        elev.last_action_tick = tick
+                self.error(f"电梯 {eid + 1} 在特殊状态下非目标楼层 OPEN")
+        elev.act("OPEN", tick)
         elev.last_open_tick = tick
         elev.is_close = False
-        watt += 0.1
+        self.watt += self.rules.door_energy
 
-    # ------ CLOSE ------
-    elif cmd == "CLOSE":
+    def local_close(self, tick, fl, eid):
+        rules = self.rules
+        elev = self.elevators[eid]
+        self.transition(elev, "CLOSE")
         if elev.floor != fl:
-            error(f"电梯 {eid + 1} CLOSE 楼层不符：实际 {elev.floor} 要求 {fl}", tick, data)
+            self.error(f"电梯 {eid + 1} CLOSE 楼层不符：实际 {elev.floor} 要求 {fl}")
         if elev.is_close:
-            error(f"电梯 {eid + 1} 重复关门", tick, data)
+            self.error(f"电梯 {eid + 1} 重复关门")
         if elev.last_open_tick > 0:
             duration = tick - elev.last_open_tick
-            if ((elev.on_sche or elev.on_update) and (not elev.after_update)):
-                req = 1.0
-            else:
-                req = 0.4
-            if duration < req - 0.0001:
-                error(f"电梯 {eid + 1} 开关门间隔 {duration:.3f}s 小于要求 {req}s", tick, data)
-        elev.last_action = "CLOSE"
-        elev.last_action_tick = tick
-        elev.last_close_tick = tick
+            req = rules.special_door_time if elev.is_special() else rules.door_time
+            self.near(f"CLOSE.door_time@{elev.mode()}", duration - (req - rules.time_tolerance))
+            if duration < req - rules.time_tolerance:
+                self.error(f"电梯 {eid + 1} 开关门间隔 {duration:.3f}s 小于要求 {req}s")
+        elev.act("CLOSE", tick)
         elev.is_close = True
-        watt += 0.1
-
-    # ------ RECEIVE ------
-    elif cmd == "RECEIVE":
-        if len(args) < 3:
-            error("RECEIVE 格式错误", tick, data)
-            continue
-        try:
-            pid = int(args[1])
-            rid = int(args[2]) - 1
-        except:
-            error("RECEIVE 中数字格式错误", tick, data)
-            continue
-        # 若处于正式特殊状态（on_sche 或 on_update）则禁止 RECEIVE；预状态或结束后允许
-        if ((elevators[rid].on_sche or elevators[rid].on_update) and (not elevators[rid].after_update)):
-            error(f"电梯 {rid + 1} 在特殊状态下不允许 RECEIVE", tick, data)
-        else:
-            if pid in receive_assign:
-                error(f"乘客 {pid} 已分配给电梯 {receive_assign[pid] + 1}，重复 RECEIVE", tick, data)
-            else:
-                receive_assign[pid] = rid
-                elevators[rid].received.add(pid)
-        elevators[rid].last_action = "RECEIVE"
-        elevators[rid].last_action_tick = tick
-
-    # ------ IN ------
-    elif cmd == "IN":
-        if len(args) < 4:
-            error("IN 格式错误", tick, data)
-            continue
-        try:
-            pid = int(args[1])
-            fl = to_int(args[2])
-            rid = int(args[3]) - 1
-        except:
-            error("IN 中数字格式错误", tick, data)
-            continue
-        if pid not in persons:
-            error(f"IN 出现未知乘客: {pid}", tick, data)
-            continue
-        if elevators[rid].is_close:
-            error(f"电梯 {rid + 1} 门关闭状态下 IN", tick, data)
-        if elevators[rid].floor != fl:
-            error(f"电梯 {rid + 1} IN 楼层错误：实际 {elevators[rid].floor} 要求 {fl}", tick, data)
-        if receive_assign.get(pid) != rid:
-            error(f"乘客 {pid} 未被分配给电梯 {rid + 1}，无法 IN", tick, data)
-        if pid in elevators[rid].received:
-            elevators[rid].received.remove(pid)
-        p = persons[pid]
+        self.watt += rules.door_energy
+
+    def local_receive(self, tick, pid, rid):
+        elev = self.elevators[rid]
+        self.transition(elev, "RECEIVE")
+        # 若处于正式特殊状态则禁止 RECEIVE；预状态或结束后允许
+        if elev.is_special():
+            self.error(f"电梯 {rid + 1} 在特殊状态下不允许 RECEIVE")
+        elev.received.add(pid)
+        elev.act("RECEIVE", tick)
+
+    def cross_receive(self, tick, pid, rid):
+        if pid in self.persons and self.persons[pid].cur != self.persons[pid].start:
+            # OUT-F 后的再次分配
+            self.cover("RECEIVE.redispatch")
+        if pid in self.receive_assign:
+            self.error(f"乘客 {pid} 已分配给电梯 {self.receive_assign[pid] + 1}，重复 RECEIVE")
+        self.receive_assign[pid] = rid
+
+    def local_in(self, tick, pid, fl, rid):
+        elev = self.elevators[rid]
+        if pid not in self.persons:
+            self.error(f"IN 出现未知乘客: {pid}")
+        self.transition(elev, "IN")
+        if elev.is_close:
+            self.error(f"电梯 {rid + 1} 门关闭状态下 IN")
+        if elev.floor != fl:
+            self.error(f"电梯 {rid + 1} IN 楼层错误：实际 {elev.floor} 要求 {fl}")
+        if pid in elev.received:
+            elev.received.remove(pid)
+        elev.peoples.add(pid)
+        if len(elev.peoples) == self.rules.capacity:
+            self.cover("near:IN.capacity")
+        if len(elev.peoples) > self.rules.capacity:
+            self.error(f"电梯 {rid + 1} 超载：人数 {len(elev.peoples)}")
+        elev.act("IN", tick)
+
+    def cross_in(self, tick, pid, fl, rid):
+        p = self.persons.get(pid)
+        if p is None:
+            return  # 未知乘客由 local_in 报错
+        if self.receive_assign.get(pid) != rid:
+            self.error(f"乘客 {pid} 未被分配给电梯 {rid + 1}，无法 IN")
         p.eid = rid
-        elevators[rid].peoples.add(p)
-        if len(elevators[rid].peoples) > 6:
-            error(f"电梯 {rid + 1} 超载：人数 {len(elevators[rid].peoples)}", tick, data)
-        elevators[rid].last_action = "IN"
-        elevators[rid].last_action_tick = tick
-
-    # ------ OUT ------
-    elif cmd == "OUT":
-        m_out = re.match(r'OUT-([SF])-(\d+)-(\S+)-(\d+)', content)
-        if not m_out:
-            error("OUT 格式错误", tick, data)
-            continue
-        outcome = m_out.group(1)
-        try:
-            pid = int(m_out.group(2))
-        except:
-            error("OUT 中乘客ID格式错误", tick, data)
-            continue
-        fl = to_int(m_out.group(3))
-        try:
-            rid = int(m_out.group(4)) - 1
-        except:
-            error("OUT 中电梯ID格式错误", tick, data)
-            continue
-        if pid not in persons:
-            error(f"OUT 出现未知乘客：{pid}", tick, data)
-            continue
-        p = persons[pid]
-        if elevators[rid].is_close:
-            error(f"电梯 {rid + 1} OUT 时门关闭", tick, data)
-        if elevators[rid].floor != fl:
-            error(f"电梯 {rid + 1} OUT 楼层错误：实际 {elevators[rid].floor} 要求 {fl}", tick, data)
-        if p not in elevators[rid].peoples:
-            error(f"乘客 {pid} 不在电梯 {rid + 1} 内，无法 OUT", tick, data)
-        if outcome == "S":
+
+    def local_out_s(self, tick, pid, fl, rid):
+        self.local_out(tick, pid, fl, rid, True)
+
+    def local_out_f(self, tick, pid, fl, rid):
+        self.local_out(tick, pid, fl, rid, False)
+
+    def cross_out_s(self, tick, pid, fl, rid):
+        self.cross_out(tick, pid, fl, rid, True)
+
+    def cross_out_f(self, tick, pid, fl, rid):
+        self.cross_out(tick, pid, fl, rid, False)
+
+    def local_out(self, tick, pid, fl, rid, success):
+        elev = self.elevators[rid]
+        if pid not in self.persons:
+            self.error(f"OUT 出现未知乘客：{pid}")
+        p = self.persons[pid]
+        self.transition(elev, "OUT-S" if success else "OUT-F")
+        if elev.is_close:
+            self.error(f"电梯 {rid + 1} OUT 时门关闭")
+        if elev.floor != fl:
+            self.error(f"电梯 {rid + 1} OUT 楼层错误：实际 {elev.floor} 要求 {fl}")
+        if pid not in elev.peoples:
+            self.error(f"乘客 {pid} 不在电梯 {rid + 1} 内，无法 OUT")
+        if success:
             if fl != p.end:
-                error(f"乘客 {pid} 标记到达，但楼层 {fl} 与目标 {p.end} 不符", tick, data)
+                self.error(f"乘客 {pid} 标记到达，但楼层 {fl} 与目标 {p.end} 不符")
+        elif fl == p.end:
+            self.error(f"乘客 {pid} 到达目标却输出 OUT-F")
+        elev.peoples.remove(pid)
+        elev.act("OUT", tick)
+
+    def cross_out(self, tick, pid, fl, rid, success):
+        p = self.persons.get(pid)
+        if p is None:
+            return
+        if success:
             p.arrive_tick = tick
-        else:
-            if fl == p.end:
-                error(f"乘客 {pid} 到达目标却输出 OUT-F", tick, data)
-        elevators[rid].peoples.remove(p)
-        if pid in receive_assign:
-            del receive_assign[pid]
-        p.cur = elevators[rid].floor
+        if pid in self.receive_assign:
+            del self.receive_assign[pid]
+        p.cur = fl  # local_out 已保证 fl 即电梯所在楼层
         p.eid = None
-        elevators[rid].last_action = "OUT"
-        elevators[rid].last_action_tick = tick
 
-    # ------ SCHE ------
-    elif cmd == "SCHE":
-        if len(args) < 2:
-            error("SCHE 格式错误", tick, data)
-            continue
-        subtype = args[1]
-        if subtype == "ACCEPT":
-            # 格式：SCHE-ACCEPT-电梯ID-临时运行速度-目标楼层
-            if len(args) < 5:
-                error("SCHE-ACCEPT 格式错误", tick, data)
-                continue
-            try:
-                rid = int(args[2]) - 1
-                spd = float(args[3])
-            except:
-                error("SCHE-ACCEPT 数字字段错误", tick, data)
-                continue
-            target_floor = to_int(args[4])
-            elev = elevators[rid]
-            elev.pre_sche = True
-            elev.on_sche_speed = spd
-            elev.sche_target = target_floor
-            elev.got_sche_tick = tick
-            elev.sche_arrive_count = 0
-            elev.last_action = "SCHE-ACCEPT"
-            elev.last_action_tick = tick
-        elif subtype == "BEGIN":
-            # 格式：SCHE-BEGIN-电梯ID
-            if len(args) < 3:
-                error("SCHE-BEGIN 格式错误", tick, data)
+    def local_sche_accept(self, tick, rid, spd, target_floor):
+        elev = self.elevators[rid]
+        self.transition(elev, "SCHE-ACCEPT")
+        elev.pre_sche = True
+        elev.on_sche_speed = spd
+        elev.sche_target = target_floor
+        elev.got_sche_tick = tick
+        elev.sche_arrive_count = 0
+        elev.act("SCHE-ACCEPT", tick)
+
+    def local_sche_begin(self, tick, rid):
+        elev = self.elevators[rid]
+        self.transition(elev, "SCHE-BEGIN")
+        if not elev.pre_sche:
+            self.error(f"电梯 {rid + 1} 未收到 SCHE-ACCEPT却输出 SCHE-BEGIN")
+        if not elev.is_close:
+            self.error(f"电梯 {rid + 1} SCHE-BEGIN 时门未关闭")
+        elev.on_sche = True
+        elev.pre_sche = False
+        elev.act("SCHE-BEGIN", tick)
+        elev.received.clear()
+
+    def cross_sche_begin(self, tick, rid):
+        self.clear_receive(rid)
+
+    def local_sche_end(self, tick, rid):
+        rules = self.rules
+        elev = self.elevators[rid]
+        self.transition(elev, "SCHE-END")
+        limit = rules.response_limit + rules.time_tolerance
+        self.near("SCHE-END.response", limit - (tick - elev.got_sche_tick))
+        if not elev.on_sche:
+            self.error(f"电梯 {rid + 1} 未处于 SCHE 状态却输出 SCHE-END")
+        if tick - elev.got_sche_tick > limit:
+            self.error(f"电梯 {rid + 1} SCHE 响应时间 {tick - elev.got_sche_tick:.3f}s 超过{rules.response_limit:g}s")
+        if elev.peoples:
+            self.error(f"电梯 {rid + 1} SCHE-END 时轿厢不为空")
+        if not elev.is_close:
+            self.error(f"电梯 {rid + 1} SCHE-END 时门未关闭")
+        elev.reset_sche()  # 清除所有 SCHE 相关状态
+        elev.act("SCHE-END", tick)
+
+    def cross_sche_end(self, tick, rid):
+        self.clear_receive(rid)
+
+    # UPDATE 命令涉及两部电梯，local 部分依次只处理 owned 中的电梯（先 A 后 B）
+    def local_update_accept(self, tick, aid, bid, target_floor):
+        for eid in (aid, bid):
+            if eid not in self.owned:
                 continue
-            try:
-                rid = int(args[2]) - 1
-            except:
-                error("SCHE-BEGIN 电梯ID格式错误", tick, data)
+            elev = self.elevators[eid]
+            self.transition(elev, "UPDATE-ACCEPT")
+            elev.pre_update = True
+            elev.update_target = target_floor
+            elev.got_update_tick = tick
+            elev.update_arrive_count = 0
+            elev.act("UPDATE-ACCEPT", tick)
+
+    def cross_update_accept(self, tick, aid, bid, target_floor):
+        for eid, partner in ((aid, bid), (bid, aid)):
+            self.elevators[eid].partner = partner
+            self.elevators[eid].cross_target = target_floor
+
+    def local_update_begin(self, tick, aid, bid):
+        limit = self.rules.pre_arrive_limit
+        for eid in (aid, bid):
+            if eid not in self.owned:
                 continue
-            elev = elevators[rid]
-            if not elev.pre_sche:
-                error(f"电梯 {rid + 1} 未收到 SCHE-ACCEPT却输出 SCHE-BEGIN", tick, data)
+            elev = self.elevators[eid]
+            self.transition(elev, "UPDATE-BEGIN")
             if not elev.is_close:
-                error(f"电梯 {rid + 1} SCHE-BEGIN 时门未关闭", tick, data)
-            elev.on_sche = True
-            elev.pre_sche = False
-            elev.last_action = "SCHE-BEGIN"
-            elev.last_action_tick = tick
-            elev.received.clear()
-            clear_global_receive(rid)
-        elif subtype == "END":
-            # 格式：SCHE-END-电梯ID
-            if len(args) < 3:
-                error("SCHE-END 格式错误", tick, data)
-                continue
-            try:
-                rid = int(args[2]) - 1
-            except:
-                error("SCHE-END 电梯ID格式错误", tick, data)
-                continue
-            elev = elevators[rid]
-            if not elev.on_sche:
-                error(f"电梯 {rid + 1} 未处于 SCHE 状态却输出 SCHE-END", tick, data)
-            if tick - elev.got_sche_tick > 6.0001:
-                error(f"电梯 {rid + 1} SCHE 响应时间 {tick - elev.got_sche_tick:.3f}s 超过6s", tick, data)
+                self.error(f"UPDATE-BEGIN 时电梯 {aid + 1} 或 {bid + 1} 门未关闭")
             if elev.peoples:
-                error(f"电梯 {rid + 1} SCHE-END 时轿厢不为空", tick, data)
-            if not elev.is_close:
-                error(f"电梯 {rid + 1} SCHE-END 时门未关闭", tick, data)
-            elev.reset_sche()  # 清除所有 SCHE 相关状态
-            clear_global_receive(rid)
-            elev.last_action = "SCHE-END"
-            elev.last_action_tick = tick
-
-    # ------ UPDATE ------
-    elif cmd == "UPDATE":
-        if len(args) < 2:
-            error("UPDATE 格式错误", tick, data)
-            continue
-        subtype = args[1]
-        if subtype == "ACCEPT":
-            # 格式：UPDATE-ACCEPT-A电梯ID-B电梯ID-目标楼层
-            if len(args) < 5:
-                error("UPDATE-ACCEPT 格式错误", tick, data)
-                continue
-            try:
-                aid = int(args[2]) - 1
-                bid = int(args[3]) - 1
-            except:
-                error("UPDATE-ACCEPT 电梯ID格式错误", tick, data)
-                continue
-            target_floor = to_int(args[4])
-            elevA = elevators[aid]
-            elevB = elevators[bid]
-            elevA.pre_update = True
-            elevB.pre_update = True
-            elevA.partner = bid
-            elevB.partner = aid
-            elevA.update_target = target_floor
-            elevB.update_target = target_floor
-            elevA.got_update_tick = tick
-            elevB.got_update_tick = tick
-            elevA.update_arrive_count = 0
-            elevB.update_arrive_count = 0
-            elevA.last_action = "UPDATE-ACCEPT"
-            elevA.last_action_tick = tick
-            elevB.last_action = "UPDATE-ACCEPT"
-            elevB.last_action_tick = tick
-        elif subtype == "BEGIN":
-            # 格式：UPDATE-BEGIN-A电梯ID-B电梯ID
-            if len(args) < 4:
-                error("UPDATE-BEGIN 格式错误", tick, data)
+                self.error(f"UPDATE-BEGIN 时电梯 {aid + 1} 或 {bid + 1} 轿厢不为空")
+            if elev.update_arrive_count > limit:
+                self.error(f"UPDATE-BEGIN 前，电梯 {aid + 1} 或 {bid + 1} ARRIVE 次数超过{limit}")
+        for eid in (aid, bid):
+            if eid not in self.owned:
                 continue
-            try:
-                aid = int(args[2]) - 1
-                bid = int(args[3]) - 1
-            except:
-                error("UPDATE-BEGIN 电梯ID格式错误", tick, data)
-                continue
-            elevA = elevators[aid]
-            elevB = elevators[bid]
-            if not (elevA.is_close and elevB.is_close):
-                error(f"UPDATE-BEGIN 时电梯 {aid + 1} 或 {bid + 1} 门未关闭", tick, data)
-            if elevA.peoples or elevB.peoples:
-                error(f"UPDATE-BEGIN 时电梯 {aid + 1} 或 {bid + 1} 轿厢不为空", tick, data)
-            if elevA.update_arrive_count > 2 or elevB.update_arrive_count > 2:
-                error(f"UPDATE-BEGIN 前，电梯 {aid + 1} 或 {bid + 1} ARRIVE 次数超过2", tick, data)
-            elevA.on_update = True
-            elevB.on_update = True
-            elevA.base = elevA.update_target
-            elevB.top = elevB.update_target
-            elevA.pre_update = False
-            elevB.pre_update = False
-            elevA.update_begin_tick = tick
-            elevB.update_begin_tick = tick
-            elevA.last_action = "UPDATE-BEGIN"
-            elevA.last_action_tick = tick
-            elevB.last_action = "UPDATE-BEGIN"
-            elevB.last_action_tick = tick
-            elevA.received.clear()
-            elevB.received.clear()
-            clear_global_receive(aid)
-            clear_global_receive(bid)
-        elif subtype == "END":
-            # 格式：UPDATE-END-A电梯ID-B电梯ID
-            if len(args) < 4:
-                error("UPDATE-END 格式错误", tick, data)
+            elev = self.elevators[eid]
+            if eid == aid:
+                elev.base = elev.update_target
+            else:
+                elev.top = elev.update_target
+            elev.on_update = True
+            elev.pre_update = False
+            elev.update_begin_tick = tick
+            elev.act("UPDATE-BEGIN", tick)
+            elev.received.clear()
+
+    def cross_update_begin(self, tick, aid, bid):
+        self.clear_receive(aid)
+        self.clear_receive(bid)
+
+    def local_update_end(self, tick, aid, bid):
+        rules = self.rules
+        limit = rules.response_limit + rules.time_tolerance
+        for eid in (aid, bid):
+            if eid not in self.owned:
                 continue
-            try:
-                aid = int(args[2]) - 1
-                bid = int(args[3]) - 1
-            except:
-                error("UPDATE-END 电梯ID格式错误", tick, data)
+            elev = self.elevators[eid]
+            self.transition(elev, "UPDATE-END")
+            self.near("UPDATE-END.response", limit - (tick - elev.got_update_tick))
+            if tick - elev.got_update_tick > limit:
+                self.error(f"UPDATE 响应时间超过{rules.response_limit:g}s：电梯 {aid + 1} 或 {bid + 1}")
+            if not elev.is_close:
+                self.error(f"UPDATE-END 时电梯 {aid + 1} 或 {bid + 1} 门未关闭")
+            if elev.peoples:
+                self.error(f"UPDATE-END 时电梯 {aid + 1} 或 {bid + 1} 轿厢不为空")
+            if eid == aid:
+                # 改造时长以 A 的 UPDATE-BEGIN 为准
+                if not elev.on_update:
+                    self.error(f"未输出 UPDATE-BEGIN 却收到 UPDATE-END：电梯 {aid + 1} 或 {bid + 1}")
+                duration = tick - elev.update_begin_tick
+                self.near("UPDATE-END.duration", duration - (rules.update_time - rules.time_tolerance))
+                if duration < rules.update_time - rules.time_tolerance:
+                    self.error(f"UPDATE 改造过程时间不足 {rules.update_time:g}s：电梯 {aid + 1} 或 {bid + 1}")
+        for eid in (aid, bid):
+            if eid not in self.owned:
                 continue
-            elevA = elevators[aid]
-            elevB = elevators[bid]
-            if tick - elevA.got_update_tick > 6.0001 or tick - elevB.got_update_tick > 6.0001:
-                error(f"UPDATE 响应时间超过6s：电梯 {aid + 1} 或 {bid + 1}", tick, data)
-            if not (elevA.is_close and elevB.is_close):
-                error(f"UPDATE-END 时电梯 {aid + 1} 或 {bid + 1} 门未关闭", tick, data)
-            if elevA.peoples or elevB.peoples:
-                error(f"UPDATE-END 时电梯 {aid + 1} 或 {bid + 1} 轿厢不为空", tick, data)
-            if elevA.on_update:
-                if tick - elevA.update_begin_tick < 1.0 - 0.0001:
-                    error(f"UPDATE 改造过程时间不足 1s：电梯 {aid + 1} 或 {bid + 1}", tick, data)
-            else:
-                error(f"未输出 UPDATE-BEGIN 却收到 UPDATE-END：电梯 {aid + 1} 或 {bid + 1}", tick, data)
-            elevA.floor = elevA.update_target + 1
-            elevB.floor = elevB.update_target - 1
-            elevA.after_update = True
-            elevB.after_update = True
-            elevA.reset_update()
-            elevB.reset_update()
-            clear_global_receive(aid)
-            clear_global_receive(bid)
-            elevA.last_action = "UPDATE-END"
-            elevA.last_action_tick = tick
-            elevB.last_action = "UPDATE-END"
-            elevB.last_action_tick = tick
+            elev = self.elevators[eid]
+            elev.floor = elev.update_target + 1 if eid == aid else elev.update_target - 1
+            elev.after_update = True
+            elev.reset_update()
+            elev.act("UPDATE-END", tick)
+
+    def cross_update_end(self, tick, aid, bid):
+        for eid, offset in ((aid, 1), (bid, -1)):
+            elev = self.elevators[eid]
+            if elev.cross_target is not None:
+                elev.cross_floor = elev.cross_target + offset
+            elev.cross_after_update = True
+            self.clear_receive(eid)
+
+    #########################################
+    # 结束时检查
+    #########################################
+    def check_partners(self):
+        # 双轿厢冲突检测（改造后状态下）
+        for elev in self.elevators:
+            if elev.cross_after_update and elev.partner is not None:
+                partner = self.elevators[elev.partner]
+                if partner.cross_after_update and elev.cross_floor == partner.cross_floor:
+                    self.error(f"双轿厢冲突：电梯 {elev.eid + 1} 与 {partner.eid + 1} 同层 {elev.cross_floor}")
+
+    def check_elevator(self, elev):
+        if not elev.is_close:
+            self.error(f"电梯 {elev.eid + 1} 结束时门未关闭")
+        if elev.peoples:
+            self.error(f"电梯 {elev.eid + 1} 结束时轿厢内仍有乘客")
+        if elev.received:
+            self.error(f"电梯 {elev.eid + 1} 结束时仍有未处理的 RECEIVE")
+        if elev.on_sche:
+            self.error(f"电梯 {elev.eid + 1} 处于未完成的 SCHE 状态")
+        if elev.on_update:
+            self.error(f"电梯 {elev.eid + 1} 处于未完成的 UPDATE 状态")
+
+    def check_persons(self):
+        # 检查所有乘客是否到达目的地
+        for pid, p in self.persons.items():
+            if p.cur != p.end:
+                self.error(f"乘客 {pid} 未到达目的地：当前 {p.cur} 目标 {p.end}")
+
+    def average_wait(self):
+        persons = self.persons.values()
+        total_priority = sum(p.priority for p in persons)
+        weighted_wait = sum(p.priority * (p.arrive_tick - p.send_tick) for p in persons)
+        return weighted_wait / total_priority if total_priority > 0 else 0.0
+
+    def finish(self):
+        """结束时检查，返回 (运行时间, 加权等待时间, 耗电量)"""
+        self.tick = None
+        self.line = None
+        self.op = None
+        self.check_partners()
+        for elev in self.elevators:
+            self.check_elevator(elev)
+        self.check_persons()
+        return self.last_output_tick, self.average_wait(), self.watt
+
+
+def iter_persons(lines, rules):
+    # lines 中的元素可为 stdin.txt 的文本行，也可为 Person 构造参数组成的元组
+    for line in lines:
+        if isinstance(line, tuple):
+            yield Person(*line)
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        if "SCHE" in line or "UPDATE" in line:
+            continue
+        yield Person.parse(line, rules)
+
 
+def load_persons(lines, rules):
+    persons = {}
+    for p in iter_persons(lines, rules):
+        if p.id in persons:
+            raise RuntimeError(f"重复的乘客请求：{p.id}")
+        persons[p.id] = p
+    return persons
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检验电梯系统输出")
+    parser.add_argument('--coverage', default=None,
+                        help="将本次运行覆盖的规则与状态转移写入该文件")
+    parser.add_argument('--spec', default=None,
+                        help="规则描述 JSON 文件，覆盖默认的楼层、电梯数、容量及各类时限")
+    parser.add_argument('--trace', default=None,
+                        help="直接读取 trace7.py 生成的二进制 trace，代替 stdin.txt 与 stdout.txt")
+    args = parser.parse_args()
+    spec = load_spec(args.spec)
+    rules = Rules(spec)
+
+    if args.trace:
+        from trace7 import load_trace
+        try:
+            stdin_lines, events = load_trace(args.trace, rules)
+        except Exception as e:
+            print("读取trace失败:", e)
+            sys.exit(1)
     else:
-        error(f"未知输出命令: {cmd}", tick, data)
+        try:
+            with open("stdin.txt", "r") as f:
+                stdin_lines = f.readlines()
+        except Exception as e:
+            print("读取stdin.txt失败:", e)
+            sys.exit(1)
+        try:
+            with open("stdout.txt", "r") as f:
+                events = f.readlines()
+        except Exception as e:
+            print("读取stdout.txt失败:", e)
+            sys.exit(1)
+    try:
+        persons = load_persons(stdin_lines, rules)
+    except Exception as e:
+        print("解析乘客请求失败:", e)
+        sys.exit(1)
 
-#########################################
-# 双轿厢冲突检测（改造后状态下）
-#########################################
-for elev in elevators:
-    if elev.after_update and elev.partner is not None:
-        partner = elevators[elev.partner]
-        if partner.after_update:
-            if elev.floor == partner.floor:
-                error(f"双轿厢冲突：电梯 {elev.eid + 1} 与 {partner.eid + 1} 同层 {elev.floor}")
+    checker = Checker(persons, spec)
+    try:
+        for event in events:
+            # 文本行需先解析；二进制 trace 中的事件已是 (时间戳, 操作码, 字段)
+            if isinstance(event, str):
+                checker.feed_line(event)
+            else:
+                checker.feed(*event)
+        total_time, avg_wait, watt = checker.finish()
+    except ValueError as e:
+        # 二进制 trace 边解码边检查，记录损坏或截断要读到该处才会发现
+        if not args.trace:
+            raise
+        print("读取trace失败:", e)
+        sys.exit(1)
+    finally:
+        # 出错时 error() 直接抛出异常，覆盖率仍需写出
+        if args.coverage:
+            checker.dump_coverage(args.coverage)
 
-#########################################
-# 检查所有电梯最终状态
-#########################################
-for elev in elevators:
-    if not elev.is_close:
-        error(f"电梯 {elev.eid + 1} 结束时门未关闭")
-    if elev.peoples:
-        error(f"电梯 {elev.eid + 1} 结束时轿厢内仍有乘客")
-    if elev.received:
-        error(f"电梯 {elev.eid + 1} 结束时仍有未处理的 RECEIVE")
-    if elev.on_sche:
-        error(f"电梯 {elev.eid + 1} 处于未完成的 SCHE 状态")
-    if elev.on_update:
-        error(f"电梯 {elev.eid + 1} 处于未完成的 UPDATE 状态")
+    if checker.error_count == 0:
+        print(f"Accepted\t运行时间: {total_time:.1f}s\t等待时间: {avg_wait:.3f}s\t耗电量: {watt:.1f}")
+    else:
+        print(f"检测到 {checker.error_count} 个错误，请检查输出日志。")
 
-#########################################
-# 检查所有乘客是否到达目的地
-#########################################
-for pid, p in persons.items():
-    if p.cur != p.end:
-        error(f"乘客 {pid} 未到达目的地：当前 {p.cur} 目标 {p.end}")
 
-#########################################
-# 输出统计信息
-#########################################
-total_time = last_output_tick
-total_priority = sum(p.priority for p in persons.values())
-weighted_wait = sum(p.priority * (p.arrive_tick - p.send_tick) for p in persons.values())
-avg_wait = weighted_wait / total_priority if total_priority > 0 else 0.0
-
-if error_count == 0:
-    print(f"Accepted\t运行时间: {total_time:.1f}s\t等待时间: {avg_wait:.3f}s\t耗电量: {watt:.1f}")
-else:
-    print(f"检测到 {error_count} 个错误，请检查输出日志。")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import argparse
+import random
+import sys
+
+from checker7 import Checker, Rules, load_persons, load_spec
+from shard7 import InputError, check_parallel
+from trace7 import encode, read_trace
+
+#########################################
+# shard7.py 与 checker7.py 的差分检验：
+# 对一份合法输出随机变异，分别顺序检验与分片检验（乘客组数 1/2/4），
+# 比较报告的错误、结果与覆盖率；文本与二进制 trace 两种输入都检验，
+# 并检查 trace 与文本的顺序检验结论一致。
+#########################################
+STDIN = """\
+[1.0]1-PRI-10-FROM-F1-TO-F3
+[4.9]SCHE-2-0.2-F3
+[7.9]UPDATE-3-4-F2
+[9.9]2-PRI-5-FROM-F1-TO-F4
+"""
+STDOUT = """\
+[   1.1000]RECEIVE-1-1
+[   1.2000]OPEN-F1-1
+[   1.3000]IN-1-F1-1
+[   1.7000]CLOSE-F1-1
+[   2.1000]ARRIVE-F2-1
+[   2.5000]ARRIVE-F3-1
+[   2.6000]OPEN-F3-1
+[   2.7000]OUT-S-1-F3-1
+[   3.0000]CLOSE-F3-1
+[   5.0000]SCHE-ACCEPT-2-0.2-F3
+[   5.4000]ARRIVE-F2-2
+[   5.5000]SCHE-BEGIN-2
+[   5.7000]ARRIVE-F3-2
+[   5.8000]OPEN-F3-2
+[   6.8000]CLOSE-F3-2
+[   6.9000]SCHE-END-2
+[   8.0000]UPDATE-ACCEPT-3-4-F2
+[   8.1000]UPDATE-BEGIN-3-4
+[   9.2000]UPDATE-END-3-4
+[   9.4000]ARRIVE-F4-3
+[   9.5000]ARRIVE-F2-4
+[  10.0000]RECEIVE-2-5
+[  10.1000]OPEN-F1-5
+[  10.2000]IN-2-F1-5
+[  10.6000]CLOSE-F1-5
+[  11.0000]ARRIVE-F2-5
+[  11.1000]OPEN-F2-5
+[  11.2000]OUT-F-2-F2-5
+[  11.5000]CLOSE-F2-5
+[  11.6000]RECEIVE-2-6
+[  12.0000]ARRIVE-F2-6
+[  12.1000]OPEN-F2-6
+[  12.2000]IN-2-F2-6
+[  12.6000]CLOSE-F2-6
+[  13.0000]ARRIVE-F3-6
+[  13.4000]ARRIVE-F4-6
+[  13.5000]OPEN-F4-6
+[  13.6000]OUT-S-2-F4-6
+[  14.0000]CLOSE-F4-6
+"""
+GROUPS = (1, 2, 4)
+
+
+def mutate(lines, rng):
+    """对输出做 1~3 处变异：删行、交换、时间戳偏移、重复、截断、UPDATE 同一电梯、改楼层或电梯编号"""
+    lines = list(lines)
+    for _ in range(rng.randint(1, 3)):
+        i = rng.randrange(len(lines))
+        line = lines[i]
+        m = rng.random()
+        if m < 0.2:
+            lines.pop(i)
+        elif m < 0.35 and i + 1 < len(lines):
+            lines[i], lines[i + 1] = lines[i + 1], lines[i]
+        elif m < 0.55:
+            # 偏移自身的时间戳，或改为比上一行早不足 0.1ms；已被截断的行可能没有完整的时间戳，跳过
+            j = line.find("]")
+            k = lines[i - 1].find("]") if i > 0 and rng.random() < 0.3 else -1
+            try:
+                if k > 0:
+                    tick = float(lines[i - 1][1:k]) - 0.00003
+                else:
+                    tick = float(line[1:j]) + rng.choice([-0.3, -0.05, 0.05, 0.3])
+            except ValueError:
+                continue
+            # 多保留一位小数，trace 须以 RAW 保存不足 0.1ms 的时间戳才能得到与文本相同的结论
+            lines[i] = f"[{tick:10.5f}]" + line[j + 1:]
+        elif m < 0.65:
+            lines.insert(i, line)
+        elif m < 0.72:
+            lines[i] = line[:rng.randrange(len(line))]
+        elif m < 0.76:
+            # 将各条 UPDATE 命令的 B 电梯改为与 A 相同
+            for k, other in enumerate(lines):
+                args = other.split("-")
+                if "UPDATE-" in other and len(args) > 3:
+                    args[3] = args[2]
+                    lines[k] = "-".join(args)
+        elif m < 0.86 and "F2" in line:
+            lines[i] = line.replace("F2", rng.choice(["F1", "F3", "F9"]), 1)
+        else:
+            lines[i] = line[:-1] + rng.choice("12345670x")
+    return lines
+
+
+def mutate_stdin(lines, rng):
+    """偶尔变异输入：重复或损坏一条乘客请求"""
+    lines = list(lines)
+    m = rng.random()
+    if m < 0.04:
+        lines.append(lines[0])
+    elif m < 0.08:
+        lines[3] = lines[3].replace("F4", "F12", 1)
+    return lines
+
+
+def check_sequential(stdin_lines, events, spec):
+    """checker7.py 的顺序检验，返回与 check_parallel 相同形式的 (错误信息, 结果, 覆盖率)"""
+    try:
+        persons = load_persons(stdin_lines, Rules(spec))
+    except Exception as e:
+        return f"解析乘客请求失败: {e}", None, set()
+    checker = Checker(persons, spec)
+    try:
+        for event in events:
+            if isinstance(event, str):
+                checker.feed_line(event)
+            else:
+                checker.feed(*event)
+        result = checker.finish()
+    except RuntimeError as e:
+        return str(e), None, checker.coverage
+    except Exception as e:
+        # checker7.py 自身抛出的异常，shard7.py 以同样的格式报告
+        return f"错误: 检验时发生异常 {e!r}", None, checker.coverage
+    return None, result, checker.coverage
+
+
+def check_sharded(stdin_lines, text, spec, groups):
+    try:
+        return check_parallel(stdin_lines, text, spec, groups)
+    except InputError as e:
+        return f"解析乘客请求失败: {e}", None, set()
+
+
+def summary(outcome):
+    """按 checker7.py 打印的精度比较结果，分片求和的顺序不同，末位可能有误差"""
+    message, result, coverage = outcome
+    if result is not None:
+        total_time, avg_wait, watt = result
+        result = f"{total_time:.1f} {avg_wait:.3f} {watt:.1f}"
+    return message, result, sorted(coverage)
+
+
+def verdict(outcome):
+    """trace 中的行按事件重新格式化，与文本比较时去掉报错末尾的原始行"""
+    message, result, coverage = outcome
+    if message is not None:
+        message = message.split(" [line: ")[0]
+    return message, result, coverage
+
+
+def compare(stdin_lines, stdout_lines, spec):
+    """返回不一致之处的说明列表"""
+    rules = Rules(spec)
+    problems = []
+    expected = summary(check_sequential(stdin_lines, stdout_lines, spec))
+    for groups in GROUPS:
+        got = summary(check_sharded(stdin_lines, "".join(stdout_lines), spec, groups))
+        if got != expected:
+            problems.append(f"文本 groups={groups}:\n  checker7: {expected[:2]}\n  shard7:   {got[:2]}")
+
+    # 二进制 trace：顺序检验直接读事件，分片检验读由事件还原的文本
+    persons, events = read_trace(encode(stdin_lines, stdout_lines, rules), rules)
+    events = list(events)
+    text = "".join((e if isinstance(e, str) else rules.format_event(*e)) + "\n" for e in events)
+    text_expected, expected = expected, summary(check_sequential(persons, events, spec))
+    if verdict(expected) != verdict(text_expected):
+        problems.append(f"trace 与文本:\n  文本:  {text_expected[:2]}\n  trace: {expected[:2]}")
+    for groups in GROUPS:
+        got = summary(check_sharded(persons, text, spec, groups))
+        if got != expected:
+            problems.append(f"trace groups={groups}:\n  checker7: {expected[:2]}\n  shard7:   {got[:2]}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="差分检验 shard7.py 与 checker7.py 的结论、报错与覆盖率")
+    parser.add_argument('--rounds', type=int, default=300, help="变异轮数")
+    parser.add_argument('--seed', type=int, default=0, help="随机数种子")
+    args = parser.parse_args()
+    spec = load_spec()
+    rng = random.Random(args.seed)
+    base_stdin = STDIN.splitlines(keepends=True)
+    base_stdout = STDOUT.splitlines()
+
+    failed = 0
+    for i in range(args.rounds):
+        stdin_lines = base_stdin if i == 0 else mutate_stdin(base_stdin, rng)
+        stdout_lines = base_stdout if i == 0 else mutate(base_stdout, rng)
+        stdout_lines = [line + "\n" for line in stdout_lines]
+        problems = compare(stdin_lines, stdout_lines, spec)
+        if problems:
+            failed += 1
+            print(f"第 {i} 轮不一致：")
+            print("".join(stdout_lines), end="")
+            for problem in problems:
+                print(problem)
+            print()
+    print(f"共 {args.rounds} 轮，不一致 {failed} 轮")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+import argparse
+import hashlib
+import os
+import random
+import re
+import shutil
+
+import generator7
+from pipeline7 import DEFAULT_COMMAND, DEFAULT_TIMEOUT, run_checker, run_pipeline
+
+FLOORS = ["B4", "B3", "B2", "B1", "F1", "F2", "F3", "F4", "F5", "F6", "F7"]
+SPECIAL_FLOORS = ["B2", "B1", "F1", "F2", "F3", "F4", "F5"]  # SCHE / UPDATE 允许的目标楼层
+SPEEDS = [0.2, 0.3, 0.4, 0.5]
+ELEVATOR_IDS = [1, 2, 3, 4, 5, 6]
+TIME_MAX = 61.0
+MAX_PASSENGERS = 100
+SCHE_INTERVAL = 6.0  # 同一电梯 SCHE 请求最小间隔
+SCHE_BEFORE_UPDATE = 8.0  # 被 UPDATE 的电梯，SCHE 须早于 UPDATE 该时长
+
+PATTERNS = {
+    "P": re.compile(r'\[([\d.]+)\](\d+)-PRI-(\d+)-FROM-(\w+)-TO-(\w+)'),
+    "S": re.compile(r'\[([\d.]+)\]SCHE-(\d+)-([\d.]+)-(\w+)'),
+    "U": re.compile(r'\[([\d.]+)\]UPDATE-(\d+)-(\d+)-(\w+)'),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="覆盖率引导的电梯输入模糊测试")
+    parser.add_argument('--iterations', type=int, default=100,
+                        help="真实运行评测管道的轮数")
+    parser.add_argument('--out', default="fuzz_out",
+                        help="输出目录：corpus/ 保存新增覆盖的输入，crashes/ 保存出错样例")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="随机数种子")
+    parser.add_argument('--seed_ratio', type=float, default=0.1,
+                        help="每轮改用 generator7 重新生成输入的概率")
+    parser.add_argument('--pipeline', default=DEFAULT_COMMAND,
+                        help="评测管道命令，{root} 为评测机所在目录")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help="单轮评测超时时间（秒）")
+    return parser.parse_args()
+
+
+#########################################
+# 输入的解析、合法化与序列化
+#########################################
+def parse_requests(lines):
+    """将 stdin.txt 的各行解析为请求字典列表"""
+    requests = []
+    for line in lines:
+        line = line.strip()
+        for kind, pattern in PATTERNS.items():
+            m = pattern.fullmatch(line)
+            if not m:
+                continue
+            g = m.groups()
+            if kind == "P":
+                requests.append({"kind": "P", "t": float(g[0]), "id": int(g[1]),
+                                 "pri": int(g[2]), "from": g[3], "to": g[4]})
+            elif kind == "S":
+                requests.append({"kind": "S", "t": float(g[0]), "eid": int(g[1]),
+                                 "speed": float(g[2]), "floor": g[3]})
+            else:
+                requests.append({"kind": "U", "t": float(g[0]), "a": int(g[1]),
+                                 "b": int(g[2]), "floor": g[3]})
+            break
+    return requests
+
+
+def normalize(requests):
+    """
+    修正变异后的输入，使其满足题目约束：
+      - 时间戳在 [0, TIME_MAX] 内、保留一位小数、非递减；
+      - 每部电梯至多参与一次 UPDATE；
+      - 同一电梯 SCHE 间隔不少于 6s，且被 UPDATE 的电梯 SCHE 须早于 UPDATE 8s；
+      - 乘客起点与终点不同，按时间重新编号。
+    """
+    requests = [dict(r, t=round(min(max(r["t"], 0.0), TIME_MAX), 1)) for r in requests]
+    requests.sort(key=lambda r: r["t"])
+
+    update_time = {}
+    kept = []
+    for r in requests:
+        if r["kind"] == "U":
+            if r["a"] == r["b"] or r["a"] in update_time or r["b"] in update_time:
+                continue
+            update_time[r["a"]] = update_time[r["b"]] = r["t"]
+        kept.append(r)
+
+    last_sche = {}
+    result = []
+    pid = 0
+    for r in kept:
+        if r["kind"] == "S":
+            eid = r["eid"]
+            if eid in update_time and r["t"] > update_time[eid] - SCHE_BEFORE_UPDATE:
+                continue
+            if eid in last_sche and r["t"] - last_sche[eid] < SCHE_INTERVAL:
+                continue
+            last_sche[eid] = r["t"]
+        elif r["kind"] == "P":
+            if r["from"] == r["to"] or pid >= MAX_PASSENGERS:
+                continue
+            pid += 1
+            r["id"] = pid
+        result.append(r)
+    return result
+
+
+def serialize(requests):
+    lines = []
+    for r in requests:
+        if r["kind"] == "P":
+            lines.append(f"[{r['t']}]{r['id']}-PRI-{r['pri']}-FROM-{r['from']}-TO-{r['to']}")
+        elif r["kind"] == "S":
+            lines.append(f"[{r['t']}]SCHE-{r['eid']}-{r['speed']}-{r['floor']}")
+        else:
+            lines.append(f"[{r['t']}]UPDATE-{r['a']}-{r['b']}-{r['floor']}")
+    return "".join(line + "\n" for line in lines)
+
+
+def digest(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+#########################################
+# 变异与重组
+#########################################
+def random_passenger(t):
+    from_floor, to_floor = random.sample(FLOORS, 2)
+    return {"kind": "P", "t": t, "id": 0, "pri": random.randint(1, 100),
+            "from": from_floor, "to": to_floor}
+
+
+def mut_shift(requests, other):
+    """随机平移一个请求的时间"""
+    if requests:
+        r = random.choice(requests)
+        r["t"] += random.uniform(-3.0, 3.0)
+    return requests
+
+
+def mut_floor(requests, other):
+    """修改一个请求的楼层"""
+    if requests:
+        r = random.choice(requests)
+        if r["kind"] == "P":
+            r[random.choice(["from", "to"])] = random.choice(FLOORS)
+        else:
+            r["floor"] = random.choice(SPECIAL_FLOORS)
+    return requests
+
+
+def mut_burst(requests, other):
+    """将若干请求挤到同一时刻，制造满载与集中分配"""
+    if requests:
+        t = random.choice(requests)["t"]
+        for r in random.sample(requests, min(len(requests), random.randint(2, 8))):
+            if r["kind"] == "P":
+                r["t"] = t
+    return requests
+
+
+def mut_insert(requests, other):
+    """插入乘客请求，或在某个已有请求附近插入 SCHE"""
+    t = random.choice(requests)["t"] if requests else random.uniform(0.0, TIME_MAX)
+    if random.random() < 0.7:
+        requests.append(random_passenger(t))
+    else:
+        requests.append({"kind": "S", "t": t + random.uniform(0.0, 1.0),
+                         "eid": random.choice(ELEVATOR_IDS),
+                         "speed": random.choice(SPEEDS), "floor": random.choice(SPECIAL_FLOORS)})
+    return requests
+
+
+def mut_delete(requests, other):
+    if requests:
+        requests.pop(random.randrange(len(requests)))
+    return requests
+
+
+def mut_sche_speed(requests, other):
+    """修改 SCHE 的临时运行速度"""
+    sches = [r for r in requests if r["kind"] == "S"]
+    if sches:
+        random.choice(sches)["speed"] = random.choice(SPEEDS)
+    return requests
+
+
+def mut_update(requests, other):
+    """将 UPDATE 贴近其电梯最后一次 SCHE 允许的边界，若无 UPDATE 则新增一个"""
+    updates = [r for r in requests if r["kind"] == "U"]
+    if not updates:
+        a, b = random.sample(ELEVATOR_IDS, 2)
+        t = random.choice(requests)["t"] if requests else random.uniform(0.0, TIME_MAX)
+        requests.append({"kind": "U", "t": t, "a": a, "b": b, "floor": random.choice(SPECIAL_FLOORS)})
+        return requests
+    u = random.choice(updates)
+    sche_times = [r["t"] for r in requests if r["kind"] == "S" and r["eid"] in (u["a"], u["b"])]
+    if sche_times:
+        u["t"] = max(sche_times) + SCHE_BEFORE_UPDATE
+    else:
+        u["floor"] = random.choice(SPECIAL_FLOORS)
+    return requests
+
+
+def mut_splice(requests, other):
+    """重组：取本输入某时刻之前的请求与另一输入该时刻之后的请求"""
+    if not other:
+        return requests
+    cut = random.uniform(0.0, TIME_MAX)
+    return [r for r in requests if r["t"] < cut] + [dict(r) for r in other if r["t"] >= cut]
+
+
+MUTATORS = [mut_shift, mut_floor, mut_burst, mut_insert, mut_delete,
+            mut_sche_speed, mut_update, mut_splice]
+
+
+def mutate(parent, other):
+    requests = [dict(r) for r in parent]
+    for _ in range(random.randint(1, 4)):
+        requests = random.choice(MUTATORS)(requests, other)
+    return normalize(requests)
+
+
+def generate_seed():
+    """借助 generator7 随机生成一份初始输入"""
+    num_updates = random.randint(0, len(ELEVATOR_IDS) // 2)
+    regular = generator7.generate_regular_requests(random.randint(10, MAX_PASSENGERS), [0.0, 50.0])
+    updates, update_info = generator7.generate_update_requests(num_updates, [20.0, TIME_MAX], ELEVATOR_IDS)
+    sches = generator7.generate_sche_requests_dense([5.0, 60.0], ELEVATOR_IDS, update_info)
+    events = sorted(regular + sches + updates, key=lambda x: x[0])
+    return normalize(parse_requests(event for _, event in events))
+
+
+#########################################
+# 语料库
+#########################################
+class Corpus:
+    def __init__(self, root):
+        self.dir = os.path.join(root, "corpus")
+        os.makedirs(self.dir, exist_ok=True)
+        self.entries = []  # (name, requests, features)
+        self.hits = {}  # feature -> 覆盖该特征的语料数
+        for name in sorted(os.listdir(self.dir)):
+            if not name.endswith(".txt"):
+                continue
+            stem = name[:-4]
+            with open(os.path.join(self.dir, name), "r", encoding="utf-8") as f:
+                requests = parse_requests(f)
+            with open(os.path.join(self.dir, stem + ".cov"), "r", encoding="utf-8") as f:
+                features = set(f.read().split())
+            self._add(stem, requests, features)
+
+    def _add(self, name, requests, features):
+        self.entries.append((name, requests, features))
+        for feature in features:
+            self.hits[feature] = self.hits.get(feature, 0) + 1
+
+    @property
+    def features(self):
+        return set(self.hits)
+
+    def add(self, name, text, features):
+        with open(os.path.join(self.dir, name + ".txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+        with open(os.path.join(self.dir, name + ".cov"), "w", encoding="utf-8") as f:
+            f.write("".join(feature + "\n" for feature in sorted(features)))
+        self._add(name, parse_requests(text.splitlines()), features)
+
+    def pick(self):
+        """按稀有度加权选择：覆盖越稀有特征（尤其是险些违例）的输入越容易被选中"""
+        weights = []
+        for _, _, features in self.entries:
+            w = 0.0
+            for feature in features:
+                w += (2.0 if feature.startswith("near:") else 1.0) / self.hits[feature]
+            weights.append(w + 1e-3)
+        return random.choices(self.entries, weights=weights)[0][1]
+
+
+def load_coverage(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return set(f.read().split())
+
+
+def main():
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+    corpus = Corpus(args.out)
+    crash_dir = os.path.join(args.out, "crashes")
+    work_dir = os.path.join(args.out, "work")
+    os.makedirs(crash_dir, exist_ok=True)
+    os.makedirs(work_dir, exist_ok=True)
+
+    # 已运行过的输入不再重复运行
+    seen_path = os.path.join(args.out, "seen.txt")
+    seen = load_coverage(seen_path)
+    seen.update(name for name, _, _ in corpus.entries)
+    total = corpus.features
+
+    with open(seen_path, "a", encoding="utf-8") as seen_file:
+        for i in range(1, args.iterations + 1):
+            for _ in range(100):
+                if not corpus.entries or random.random() < args.seed_ratio:
+                    requests = generate_seed()
+                else:
+                    other = random.choice(corpus.entries)[1]
+                    requests = mutate(corpus.pick(), other)
+                text = serialize(requests)
+                name = digest(text)
+                if name not in seen:
+                    break
+            else:
+                print(f"[{i}] 未能生成新的输入，结束")
+                break
+            seen.add(name)
+            seen_file.write(name + "\n")
+            seen_file.flush()
+
+            with open(os.path.join(work_dir, "stdin.txt"), "w", encoding="utf-8") as f:
+                f.write(text)
+            cov_path = os.path.join(work_dir, "cov.txt")
+            if os.path.exists(cov_path):
+                os.remove(cov_path)
+            status = run_pipeline(work_dir, args.pipeline, args.timeout)
+            # checker 在 work_dir 中运行，覆盖率文件须用相对于 work_dir 的路径
+            accepted, output = run_checker(work_dir, ["--coverage", "cov.txt"])
+            features = load_coverage(cov_path)
+
+            new = features - total
+            if status != "ok" or not accepted:
+                dest = os.path.join(crash_dir, name)
+                os.makedirs(dest, exist_ok=True)
+                for artifact in ("stdin.txt", "stdout.txt", "out.txt"):
+                    shutil.copy(os.path.join(work_dir, artifact), dest)
+                with open(os.path.join(dest, "checker.txt"), "w", encoding="utf-8") as f:
+                    f.write(f"pipeline: {status}\n{output}\n")
+            if new:
+                corpus.add(name, text, features)
+                total |= features
+
+            if status != "ok":
+                verdict = f"FAIL (pipeline {status})"
+            else:
+                verdict = "Accepted" if accepted else "FAIL (checker)"
+            print(f"[{i}] {name} {verdict} 新增覆盖 {len(new)} 总覆盖 {len(total)} 语料 {len(corpus.entries)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,8 @@ def parse_args():
                         help="电梯 ID 列表")
     parser.add_argument('--max_concurrent', type=int, default=5,
                         help="最大并发请求数")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="随机数种子，相同种子生成相同数据")
     return parser.parse_args()
 
 
@@ -129,6 +131,8 @@ def generate_sche_requests_dense(sche_time_range, elevator_ids, update_info):
 
 def main():
     args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
 
     # 生成普通乘客请求，时间范围 [0,70] 秒
     regular_events = generate_regular_requests(args.num_regular_requests, args.time_range)
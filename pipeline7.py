@@ -0,0 +1,60 @@
+import os
+import signal
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CHECKER = os.path.join(ROOT, "checker7.py")
+
+# 与 auto.bat 相同的评测管道；{root} 会被替换为评测机所在目录
+DEFAULT_COMMAND = '"{root}/datainput_student_win64.exe" | java -jar "{root}/hw7.jar"'
+DEFAULT_TIMEOUT = 120
+
+
+def _kill(proc):
+    """结束管道进程及其全部子进程"""
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/T", "/F", "/PID", str(proc.pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    proc.wait()
+
+
+def run_pipeline(workdir, command=DEFAULT_COMMAND, timeout=DEFAULT_TIMEOUT):
+    """
+    在 workdir 中运行评测管道（读取 workdir/stdin.txt）：
+      - 原始输出写入 out.txt，去掉 [Log] 行后写入 stdout.txt（同 transfer.py）；
+      - 返回 "ok"、"timeout" 或 "exit <返回码>"。
+    """
+    out_path = os.path.join(workdir, "out.txt")
+    with open(out_path, "w", encoding="utf-8") as out:
+        proc = subprocess.Popen(command.format(root=ROOT), shell=True, cwd=workdir,
+                                stdout=out, stderr=subprocess.STDOUT,
+                                start_new_session=(os.name != "nt"))
+        try:
+            code = proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _kill(proc)
+            code = None
+    with open(out_path, "r", encoding="utf-8", errors="replace") as infile, \
+            open(os.path.join(workdir, "stdout.txt"), "w", encoding="utf-8") as outfile:
+        for line in infile:
+            if not line.startswith('[Log]'):
+                outfile.write(line)
+    if code is None:
+        return "timeout"
+    return "ok" if code == 0 else f"exit {code}"
+
+
+def run_checker(workdir, extra_args=()):
+    """在 workdir 中运行 checker7.py，返回 (是否 Accepted, checker 输出)"""
+    env = dict(os.environ, PYTHONIOENCODING="utf-8")
+    result = subprocess.run([sys.executable, CHECKER, *extra_args], cwd=workdir, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            encoding="utf-8", errors="replace")
+    output = result.stdout.strip()
+    return result.returncode == 0 and output.startswith("Accepted"), output
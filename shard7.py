@@ -0,0 +1,519 @@
+import argparse
+import multiprocessing
+import operator
+import os
+import pickle
+import re
+import sys
+from array import array
+
+from checker7 import OPCODES, OPCODE_OF, Checker, ParseError, Rules, iter_persons, load_persons, load_spec
+
+#########################################
+# 按电梯分片并行检验同一份输出，分两轮：
+#   1. 切分：输出按行均分为若干块，各块并行地检查块内时间戳递增、解析 stdin.txt 的对应部分，
+#      并把每行分发给需要它的分片，整份文本只被扫描这一遍；
+#   2. 检验：每部电梯一个 ElevatorShard，只做该电梯的 local 检查（门、楼层、轿厢、特殊状态、耗电）；
+#      另有若干 CrossShard 按乘客 id 取模分组，做 RECEIVE 分配、乘客位置等 cross 检查，
+#      第 0 组还负责双轿厢同层检查。各分片只收到与自己相关的行。
+# 各分片遇到第一个错误即停止，并记录排序键 (行号, 阶段, 子序号)，合并时取最小者，
+# 与 checker7.py 顺序检验报告的错误一致；覆盖率也只保留排序键不大于该错误的部分。
+#########################################
+STAGE_PARSE = 0
+STAGE_TICK = 1
+STAGE_LOCAL = 2  # 子序号：UPDATE 命令中 A 为 0、B 为 1
+STAGE_CROSS = 3
+# 全部输出之后的结束检查，行号取输出总行数
+FINISH_PARTNERS = 0
+FINISH_ELEVATORS = 1  # 子序号：电梯下标
+FINISH_PERSONS = 2  # 子序号：乘客在 stdin.txt 中的次序
+
+# 操作码 -> 电梯编号字段的下标
+ELEVATOR_FIELDS = [[i for i, kind in enumerate(kinds) if kind == "E"] for _, kinds in OPCODES]
+# 以乘客编号为第一个字段的命令
+PASSENGER_OPS = {op for op, (_, kinds) in enumerate(OPCODES) if kinds[0] == "P"}
+ARRIVE = OPCODE_OF["ARRIVE"]
+# 乘客相关的行，分组取其中的乘客编号
+PASSENGER_LINE = re.compile(r"[^\]]*\]\s*(?:RECEIVE|IN|OUT-[SF])-([^-]*)")
+# 分片文本中乘客相关各行的乘客编号
+PASSENGER_FIELD = re.compile(r"^[^\]\n]*\][^\S\n]*(?:RECEIVE|IN|OUT-[SF])-([^-\n]*)", re.M)
+# 整块文本中各行的时间戳，与 Rules.parse_line 一致：去掉行首空白后以 [ 开头，取到第一个 ]
+TICK_LINE = re.compile(r"^[^\S\n]*\[([^\]\n]*)\]", re.M)
+
+
+class InputError(Exception):
+    """stdin.txt 中的乘客请求有误，对应 checker7.py 的“解析乘客请求失败”"""
+
+
+class Shard(Checker):
+    def __init__(self, persons, spec):
+        super().__init__(persons, spec)
+        self.index = 0  # 当前行号
+        self.stage = STAGE_PARSE
+        self.sub = 0
+        self.key = None
+        self.coverage = {}  # 覆盖项 -> 首次覆盖时的排序键
+
+    def error(self, msg):
+        self.key = (self.index, self.stage, self.sub)
+        super().error(msg)
+
+    def cover(self, feature):
+        if feature not in self.coverage:
+            self.coverage[feature] = (self.index, self.stage, self.sub)
+
+    def parse(self, data):
+        self.stage = STAGE_PARSE
+        self.sub = 0
+        try:
+            return self.rules.parse_line(data)
+        except ParseError as e:
+            self.tick = e.tick
+            self.line = data
+            self.op = None
+            self.error(str(e))
+
+    def check_tick(self, tick):
+        self.stage = STAGE_TICK
+        self.sub = 0
+        if tick < self.last_output_tick:
+            self.error(f"时间戳不递增：{tick} < {self.last_output_tick}")
+        self.last_output_tick = tick
+
+    def run(self, numbered, total):
+        """
+        依次检验 (行号, 文本行)，total 为输出总行数。
+        返回 (错误, 结果)；错误为 (排序键, 错误信息)，无错误时为 None。
+        """
+        try:
+            for index, line in numbered:
+                self.index = index
+                self.feed_line(line)
+            self.index = total
+            self.tick = None
+            self.line = None
+            self.op = None
+            result = self.finish_shard()
+        except RuntimeError as e:
+            if self.key is None:
+                raise
+            return (self.key, str(e)), None
+        except Exception as e:
+            # 分片在顺序检验早已报错的位置之后仍会继续运行，可能遇到异常状态；
+            # 仅当它是最早的错误时才会被报告
+            return ((self.index, self.stage, self.sub), f"错误: 检验时发生异常 {e!r}"), None
+        return None, result
+
+
+class ElevatorShard(Shard):
+    PARTS = ("local",)
+
+    def __init__(self, persons, spec, eid):
+        super().__init__(persons, spec)
+        self.eid = eid
+        self.owned = {eid}
+
+    def feed_line(self, line):
+        data = line.strip()
+        if not data:
+            return
+        try:
+            tick, op, fields = self.rules.parse_line(data)
+        except ParseError:
+            self.parse(data)
+        self.feed(tick, op, fields, data)
+
+    def feed(self, tick, op, fields, line=None):
+        positions = ELEVATOR_FIELDS[op]
+        if fields[positions[0]] == self.eid:
+            self.sub = 0
+        elif len(positions) > 1 and fields[positions[1]] == self.eid:
+            self.sub = 1
+        else:
+            return
+        self.tick = tick
+        self.line = line
+        self.op = op
+        self.fields = fields
+        self.stage = STAGE_LOCAL
+        self.handlers[op](tick, *fields)
+
+    def finish_shard(self):
+        self.stage = FINISH_ELEVATORS
+        self.sub = self.eid
+        self.check_elevator(self.elevators[self.eid])
+        return {"watt": self.watt}
+
+
+class CrossShard(Shard):
+    PARTS = ("cross",)
+
+    def __init__(self, persons, spec, group=0, groups=1, order=None):
+        # order 为全体乘客在 stdin.txt 中的次序，persons 可只含本组乘客
+        self.order = order if order is not None else {pid: i for i, pid in enumerate(persons)}
+        super().__init__({pid: p for pid, p in persons.items() if pid % groups == group}, spec)
+        self.group = group
+        self.groups = groups
+
+    def wants(self, data):
+        """该行是否需要本组完整解析"""
+        try:
+            eid = self.rules.elevator(data.rpartition("-")[2])
+        except ValueError:
+            return True  # 不属于任何 ElevatorShard 的行（含 ACCEPT 命令）在此解析
+        if "SCHE-" in data or "UPDATE-" in data:
+            return True
+        m = PASSENGER_LINE.match(data)
+        if m is not None:
+            try:
+                return int(m.group(1)) % self.groups == self.group
+            except ValueError:
+                return True
+        # 第 0 组收到全部 ARRIVE，只有改造完成的电梯需要做同层检查
+        return "ARRIVE" in data and self.group == 0 and self.elevators[eid].cross_after_update
+
+    def feed_line(self, line):
+        data = line.strip()
+        if not data:
+            return
+        # 收到的行已按 route 筛选，除 wants 的超集外只多出第 0 组的 ARRIVE，须按改造状态再判断
+        if self.group == 0 and "ARRIVE" in data and not self.wants(data):
+            return
+        self.feed(*self.parse(data), data)
+
+    def feed(self, tick, op, fields, line=None):
+        if op in PASSENGER_OPS and fields[0] % self.groups != self.group:
+            return
+        if op == ARRIVE and self.group != 0:
+            return
+        self.tick = tick
+        self.line = line
+        self.op = op
+        self.fields = fields
+        self.stage = STAGE_CROSS
+        self.sub = 0
+        self.handlers[op](tick, *fields)
+
+    def check_persons(self):
+        self.stage = FINISH_PERSONS
+        for pid, p in self.persons.items():
+            self.sub = self.order[pid]
+            if p.cur != p.end:
+                self.error(f"乘客 {pid} 未到达目的地：当前 {p.cur} 目标 {p.end}")
+
+    def finish_shard(self):
+        if self.group == 0:
+            self.stage = FINISH_PARTNERS
+            self.sub = 0
+            self.check_partners()
+        self.check_persons()
+        persons = self.persons.values()
+        return {
+            "priority": sum(p.priority for p in persons),
+            "weighted_wait": sum(p.priority * (p.arrive_tick - p.send_tick) for p in persons),
+        }
+
+
+#########################################
+# 第一轮：切分
+#########################################
+def read_tick(data):
+    """按 Rules.parse_line 的规则取出时间戳，无法解析时返回 None"""
+    i = data.find("]")
+    if data[0] != "[" or i < 0:
+        return None
+    try:
+        return float(data[1:i])
+    except ValueError:
+        return None
+
+
+def last_tick_before(text, end):
+    """text 中 end 之前最后一个非空行的时间戳；没有这样的行时为 0.0，无法解析时为 None"""
+    while end > 0:
+        start = text.rfind("\n", 0, end - 1) + 1
+        data = text[start:end].strip()
+        if data:
+            return read_tick(data)
+        end = start
+    return 0.0
+
+
+def check_ticks(text, offset, last_tick, spec):
+    """
+    检查一块输出（首行行号为 offset）的时间戳递增，last_tick 为此前最后一行的时间戳。
+    返回 (时间戳错误, 块内最后的时间戳)；last_tick 为 None 表示此前有一行格式错误，其后无需再查。
+    """
+    if last_tick is None or not text:
+        return None, last_tick
+    # 通常每行都有时间戳且已有序，整块用正则取出后逐对比较，不必在 Python 中逐行处理
+    try:
+        ticks = [float(s) for s in TICK_LINE.findall(text)]
+    except ValueError:
+        ticks = []
+    if len(ticks) == text.count("\n") + 1 and all(map(operator.le, [last_tick, *ticks], ticks)):
+        return None, ticks[-1]
+
+    index = offset - 1
+    for line in text.split("\n"):
+        index += 1
+        data = line.strip()
+        if not data:
+            continue
+        tick = read_tick(data)
+        if tick is None:
+            # 该行格式错误，由解析它的分片报告，其后的时间戳倒退都在它之后
+            return None, None
+        if tick < last_tick:
+            ticker = Shard({}, spec)  # 生成与 checker7.py 相同格式的错误信息
+            ticker.index = index
+            ticker.tick = tick
+            ticker.line = data
+            ticker.last_output_tick = last_tick
+            try:
+                ticker.check_tick(tick)
+            except RuntimeError as e:
+                return (ticker.key, str(e)), None
+        last_tick = tick
+    return None, last_tick
+
+
+def route(data, rules, groups):
+    """
+    一行输出要交给哪些分片：电梯分片下标为电梯下标，乘客组 g 的下标为 电梯数 + g。
+    与 ElevatorShard 的筛选一致：除 ACCEPT 与 UPDATE 外，各命令的电梯编号都在行尾；
+    乘客组收到 CrossShard.wants 的超集，其中 ARRIVE 是否需要要到检验时才知道，
+    行尾不是合法电梯编号的行交给所有乘客组解析并报错。
+    """
+    n = rules.elevators
+    try:
+        eid = rules.elevator(data.rpartition("-")[2])
+    except ValueError:
+        eid = None
+    if "ACCEPT" in data or "UPDATE" in data:
+        targets = list(range(n))
+    else:
+        targets = [] if eid is None else [eid]
+    if eid is None or "SCHE-" in data or "UPDATE-" in data:
+        return targets + list(range(n, n + groups))
+    m = PASSENGER_LINE.match(data)
+    if m is not None:
+        try:
+            targets.append(n + int(m.group(1)) % groups)
+        except ValueError:
+            targets += range(n, n + groups)
+    elif "ARRIVE" in data:
+        targets.append(n)
+    return targets
+
+
+def split_chunk(task):
+    """
+    处理输出的一块（首行行号为 offset）及 stdin.txt 的对应部分，返回
+    (乘客, 乘客请求错误, 时间戳错误, 块内最后的时间戳, 各分片的 (文本, 行号))，
+    分片依次为各部电梯与各乘客组。
+    """
+    spec, groups, offset, last_tick, arrive_from, text, stdin_lines = task
+    rules = Rules(spec)
+    persons = []
+    person_error = None
+    try:
+        for p in iter_persons(stdin_lines, rules):
+            persons.append((p.id, p.priority, p.send_tick, p.start, p.end))
+    except Exception as e:
+        person_error = str(e)
+    tick_error, last_tick = check_ticks(text, offset, last_tick, spec)
+
+    n = rules.elevators
+    lines = [[] for _ in range(n + groups)]
+    indices = [array("q") for _ in range(n + groups)]
+    eid_of = {str(eid + 1): eid for eid in range(n)}
+    index = offset - 1
+    for line in text.split("\n"):
+        index += 1
+        data = line.strip()
+        if not data:
+            continue
+        # 绝大多数行只属于行尾的电梯，乘客进出与 RECEIVE 再交给一个乘客组，
+        # ARRIVE 再交给第 0 组（首个 UPDATE 之前没有电梯完成改造，不必交）；其余的行按 route 的完整规则分发
+        eid = eid_of.get(data[data.rfind("-") + 1:])
+        if eid is None or "ACCEPT" in data or "UPDATE" in data or "SCHE-" in data:
+            for k in route(data, rules, groups):
+                lines[k].append(data)
+                indices[k].append(index)
+            continue
+        lines[eid].append(data)
+        indices[eid].append(index)
+        if "IN-" in data or "OUT-" in data or "RECEIVE-" in data:
+            m = PASSENGER_LINE.match(data)
+            if m is None:
+                continue
+            try:
+                targets = (n + int(m.group(1)) % groups,)
+            except ValueError:
+                targets = range(n, n + groups)
+        elif "ARRIVE" in data and index > arrive_from:
+            targets = (n,)
+        else:
+            continue
+        for k in targets:
+            lines[k].append(data)
+            indices[k].append(index)
+
+    shards = [("\n".join(shard_lines), shard_indices) for shard_lines, shard_indices in zip(lines, indices)]
+    return persons, person_error, tick_error, last_tick, shards
+
+
+#########################################
+# 第二轮：检验一个分片
+#########################################
+def check_shard(task):
+    """task 为 ("elevator", 电梯下标, …) 或 ("cross", 组号, …)，返回 (种类, 错误, 结果, 覆盖率)"""
+    kind, arg, groups, spec, persons, text, indices, total = task
+    rules = Rules(spec)
+    persons = pickle.loads(persons)
+    # 只构造本分片用得到的乘客：电梯分片为其输出中出现的乘客，乘客组为本组乘客
+    if kind == "elevator":
+        wanted = set()
+        for s in PASSENGER_FIELD.findall(text):
+            try:
+                wanted.add(int(s))
+            except ValueError:
+                pass  # 该行解析时报错，不会查找乘客
+        shard = ElevatorShard(load_persons([p for p in persons if p[0] in wanted], rules), spec, arg)
+    else:
+        order = {p[0]: i for i, p in enumerate(persons)}
+        mine = load_persons([p for p in persons if p[0] % groups == arg], rules)
+        shard = CrossShard(mine, spec, arg, groups, order)
+    error, result = shard.run(zip(indices, text.split("\n") if text else []), total)
+    return kind, error, result, shard.coverage
+
+
+def check_parallel(stdin_lines, text, spec, jobs=1, run=map):
+    """
+    并行检验一份输出：stdin_lines 为 stdin.txt 各行，text 为 stdout.txt 全文，run 为 map 或进程池的 map。
+    返回 (错误信息, (运行时间, 加权等待时间, 耗电量), 覆盖率)，无错误时错误信息为 None；
+    乘客请求有误时抛出 InputError。
+    """
+    rules = Rules(spec)
+    groups = jobs  # 乘客组数与块数都取进程数，与电梯数无关
+    if text and not text.endswith("\n"):
+        text += "\n"
+    total = text.count("\n")
+    # 首个含 UPDATE 的行之前没有电梯完成改造，第 0 组不必检查这之前的 ARRIVE
+    first_update = text.find("UPDATE")
+    arrive_from = total if first_update < 0 else text.count("\n", 0, first_update)
+
+    # 按字符数均分，边界对齐到行首
+    bounds = [0]
+    for k in range(1, jobs):
+        pos = max(bounds[-1], len(text) * k // jobs)
+        if pos > 0:
+            pos = text.find("\n", pos - 1) + 1 or len(text)
+        bounds.append(pos)
+    bounds.append(len(text))
+    step = -(-len(stdin_lines) // jobs)
+    tasks = []
+    offset = 0
+    for k in range(jobs):
+        start, end = bounds[k], bounds[k + 1]
+        tasks.append((spec, groups, offset, last_tick_before(text, start), arrive_from, text[start:end].rstrip("\n"),
+                      stdin_lines[k * step:(k + 1) * step]))
+        offset += text.count("\n", start, end)
+    chunks = list(run(split_chunk, tasks))
+
+    # 乘客请求：与 load_persons 一样报告最靠前的错误
+    persons = []
+    for chunk in chunks:
+        persons += chunk[0]
+        if chunk[1] is not None:
+            break
+    if len({p[0] for p in persons}) != len(persons):
+        try:
+            load_persons(persons, rules)
+        except RuntimeError as e:
+            raise InputError(e)
+    for chunk in chunks:
+        if chunk[1] is not None:
+            raise InputError(chunk[1])
+
+    errors = [chunk[2] for chunk in chunks if chunk[2] is not None][:1]
+    last_tick = 0.0
+    for chunk in chunks:
+        if chunk[3] is not None:
+            last_tick = chunk[3]
+    persons = pickle.dumps(persons, pickle.HIGHEST_PROTOCOL)
+    tasks = []
+    for k in range(rules.elevators + groups):
+        shard_text = "\n".join(chunk[4][k][0] for chunk in chunks if chunk[4][k][0])
+        shard_indices = array("q")
+        for chunk in chunks:
+            shard_indices.extend(chunk[4][k][1])
+        if k < rules.elevators:
+            tasks.append(("elevator", k, groups, spec, persons, shard_text, shard_indices, total))
+        else:
+            tasks.append(("cross", k - rules.elevators, groups, spec, persons, shard_text, shard_indices, total))
+    # 行数多的分片先开始，减少最后只剩一个分片在跑的时间
+    tasks.sort(key=lambda task: len(task[6]), reverse=True)
+    outcomes = list(run(check_shard, tasks))
+
+    errors += [error for _, error, _, _ in outcomes if error is not None]
+    worst = min(errors)[0] if errors else None
+    coverage = set()
+    for _, _, _, cov in outcomes:
+        coverage.update(feature for feature, key in cov.items() if worst is None or key <= worst)
+    if errors:
+        return min(errors)[1], None, coverage
+    cross = [result for kind, _, result, _ in outcomes if kind == "cross"]
+    total_priority = sum(r["priority"] for r in cross)
+    weighted_wait = sum(r["weighted_wait"] for r in cross)
+    avg_wait = weighted_wait / total_priority if total_priority > 0 else 0.0
+    watt = sum(result["watt"] for kind, _, result, _ in outcomes if kind == "elevator")
+    return None, (last_tick, avg_wait, watt), coverage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按电梯分片并行检验电梯系统输出，结论与 checker7.py 一致")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="工作进程数，默认为 CPU 核数；为 1 时在本进程内依次检验各分片")
+    parser.add_argument('--coverage', default=None,
+                        help="将本次运行覆盖的规则与状态转移写入该文件")
+    parser.add_argument('--spec', default=None,
+                        help="规则描述 JSON 文件，覆盖默认的楼层、电梯数、容量及各类时限")
+    args = parser.parse_args()
+    spec = load_spec(args.spec)
+    jobs = max(1, args.jobs or os.cpu_count() or 1)
+
+    try:
+        with open("stdin.txt", "r") as f:
+            stdin_lines = f.readlines()
+    except Exception as e:
+        print("读取stdin.txt失败:", e)
+        sys.exit(1)
+    try:
+        with open("stdout.txt", "r") as f:
+            text = f.read()
+    except Exception as e:
+        print("读取stdout.txt失败:", e)
+        sys.exit(1)
+    try:
+        if jobs == 1:
+            message, result, coverage = check_parallel(stdin_lines, text, spec)
+        else:
+            with multiprocessing.Pool(jobs) as pool:
+                message, result, coverage = check_parallel(stdin_lines, text, spec, jobs, pool.map)
+    except InputError as e:
+        print("解析乘客请求失败:", e)
+        sys.exit(1)
+    if args.coverage:
+        with open(args.coverage, "w", encoding="utf-8") as f:
+            for feature in sorted(coverage):
+                f.write(feature + "\n")
+    if message is not None:
+        raise RuntimeError(message)
+    total_time, avg_wait, watt = result
+    print(f"Accepted\t运行时间: {total_time:.1f}s\t等待时间: {avg_wait:.3f}s\t耗电量: {watt:.1f}")
+
+
+if __name__ == "__main__":
+    main()
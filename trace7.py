@@ -0,0 +1,336 @@
+import argparse
+import sys
+
+from checker7 import OPCODES, ParseError, Rules, load_spec
+
+#########################################
+# 二进制 trace 格式
+#   文件头：MAGIC + 版本号
+#   每条记录：zigzag varint 时间增量 + 操作码字节 + 各字段 varint
+#   - 时间以 0.1ms 为单位（输出时间戳保留 4 位小数，按毫秒存会丢精度）；
+#     时间戳或速度不能按 0.1ms 精确表示的行以 RAW 保存，以免取整后改变检查结论；
+#   - 时间增量相对于同一段（输入/输出）中的上一条记录，允许为负以便检查器发现时间倒退；
+#   - 操作码 0~12 与 checker7.OPCODES 一致，输入请求从 0x40 开始；
+#   - 无法解析的行以 RAW 记录原样保存，检查时得到与文本相同的结论；
+#   - 文件以 END 记录结尾（版本 2 起），缺少 END 即视为截断。
+#########################################
+MAGIC = b"TRC7"
+VERSION = 2
+VERSIONS = (1, 2)  # 可读取的版本，版本 1 没有 END 记录
+TICK_SCALE = 10000  # 每秒的时间单位数
+
+# 输入请求表：操作码为 REQUEST_BASE + 下标。字段类型另有 N：普通整数（优先级）
+REQUEST_BASE = 0x40
+REQUESTS = (
+    ("PERSON", "PNFF"),
+    ("SCHE", "ESF"),
+    ("UPDATE", "EEF"),
+)
+OP_END = 0x7d  # trace 结束
+OP_OUTPUT = 0x7e  # 输入段结束、输出段开始，时间基准归零
+OP_RAW = 0x7f  # 原样保存的文本行：varint 长度 + UTF-8 字节
+
+
+#########################################
+# varint 编解码
+#########################################
+def write_varint(out: bytearray, n: int):
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def read_varint(buf, pos):
+    b = buf[pos]
+    pos += 1
+    if b < 0x80:
+        return b, pos
+    result = b & 0x7f
+    shift = 7
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7f) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def zigzag(n):
+    return n << 1 if n >= 0 else (-n << 1) - 1
+
+
+def unzigzag(n):
+    return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+
+def to_units(x):
+    """按 0.1ms 换算为整数，不能精确表示时抛出 ValueError"""
+    n = round(x * TICK_SCALE)
+    if n / TICK_SCALE != x:
+        raise ValueError(f"{x} 超出 0.1ms 精度")
+    return n
+
+
+# 字段类型 -> (编码为非负整数, 解码)
+FIELD_CODECS = {
+    "F": (zigzag, unzigzag),
+    "E": (int, int),
+    "P": (int, int),
+    "N": (int, int),
+    "S": (to_units, lambda n: n / TICK_SCALE),
+}
+OUTPUT_KINDS = [fields for _, fields in OPCODES]
+REQUEST_KINDS = [fields for _, fields in REQUESTS]
+
+
+#########################################
+# 文本 -> 二进制
+#########################################
+def parse_request(data, rules):
+    """将 stdin.txt 的一行解析为 (时间戳, 操作码, 字段)，无法解析时抛出 ValueError"""
+    i = data.find("]")
+    if data[0] != "[" or i < 0:
+        raise ValueError(data)
+    tick = float(data[1:i])
+    args = data[i + 1:].split("-")
+    if args[0] == "SCHE" and len(args) == 4:
+        return tick, REQUEST_BASE + 1, [rules.elevator(args[1]), float(args[2]), rules.floor(args[3])]
+    if args[0] == "UPDATE" and len(args) == 4:
+        return tick, REQUEST_BASE + 2, [rules.elevator(args[1]), rules.elevator(args[2]), rules.floor(args[3])]
+    if len(args) == 7 and args[1] == "PRI" and args[3] == "FROM" and args[5] == "TO":
+        return tick, REQUEST_BASE, [int(args[0]), int(args[2]), rules.floor(args[4]), rules.floor(args[6])]
+    raise ValueError(data)
+
+
+class TraceWriter:
+    def __init__(self):
+        self.out = bytearray(MAGIC)
+        self.out.append(VERSION)
+        self.last = 0
+
+    def record(self, tick, op, kinds, fields):
+        values = [FIELD_CODECS[kind][0](value) for kind, value in zip(kinds, fields)]
+        if any(value < 0 for value in values):
+            raise ValueError(f"字段不能为负：{fields}")
+        t = to_units(tick)
+        write_varint(self.out, zigzag(t - self.last))
+        self.last = t
+        self.out.append(op)
+        for value in values:
+            write_varint(self.out, value)
+
+    def raw(self, line):
+        data = line.encode("utf-8")
+        write_varint(self.out, 0)
+        self.out.append(OP_RAW)
+        write_varint(self.out, len(data))
+        self.out += data
+
+    def start_output(self):
+        write_varint(self.out, 0)
+        self.out.append(OP_OUTPUT)
+        self.last = 0
+
+    def end(self):
+        write_varint(self.out, 0)
+        self.out.append(OP_END)
+
+
+def encode(stdin_lines, stdout_lines, rules):
+    """将 stdin.txt 与 stdout.txt（或 out.txt，[Log] 行会被忽略）编码为一个二进制 trace"""
+    writer = TraceWriter()
+    for line in stdin_lines:
+        data = line.strip()
+        if not data:
+            continue
+        try:
+            tick, op, fields = parse_request(data, rules)
+            writer.record(tick, op, REQUEST_KINDS[op - REQUEST_BASE], fields)
+        except (ValueError, OverflowError):  # [inf] 等无法换算为整数的时间戳
+            writer.raw(data)
+    writer.start_output()
+    for line in stdout_lines:
+        data = line.strip()
+        if not data or data.startswith("[Log]"):
+            continue
+        try:
+            tick, op, fields = rules.parse_line(data)
+            writer.record(tick, op, OUTPUT_KINDS[op], fields)
+        except (ParseError, ValueError, OverflowError):
+            writer.raw(data)
+    writer.end()
+    return bytes(writer.out)
+
+
+#########################################
+# 二进制 -> 事件
+#########################################
+def iter_records(buf):
+    """
+    逐条产出二进制 trace 中的记录：
+      - 普通记录为 (时间戳, 操作码, 字段)，RAW 记录为原始文本行（str）；
+      - 输入段与输出段之间产出一个 None。
+    文件损坏或被截断时抛出 ValueError。
+    """
+    if buf[:len(MAGIC)] != MAGIC:
+        raise ValueError("不是 trace7 格式的文件")
+    if len(buf) <= len(MAGIC):
+        raise ValueError("trace 截断")
+    version = buf[len(MAGIC)]
+    if version not in VERSIONS:
+        raise ValueError(f"不支持的 trace 版本：{version}")
+    # 操作码 -> 字段类型；E/P/N 解码即为原值，只有 F、S 需要转换
+    kinds_of = {op: kinds for op, kinds in enumerate(OUTPUT_KINDS)}
+    for i, kinds in enumerate(REQUEST_KINDS):
+        kinds_of[REQUEST_BASE + i] = kinds
+
+    pos = len(MAGIC) + 1
+    end = len(buf)
+    t = 0
+    # 绝大多数 varint 只有一个字节，循环内直接处理以减少函数调用；
+    # 读到文件末尾之外时 buf[pos] 抛出 IndexError，即记录不完整
+    try:
+        while pos < end:
+            delta = buf[pos]
+            if delta < 0x80:
+                pos += 1
+            else:
+                delta, pos = read_varint(buf, pos)
+            t += delta >> 1 if not delta & 1 else -((delta + 1) >> 1)
+            op = buf[pos]
+            pos += 1
+            if op == OP_RAW:
+                n, pos = read_varint(buf, pos)
+                if pos + n > end:
+                    raise IndexError
+                yield bytes(buf[pos:pos + n]).decode("utf-8")
+                pos += n
+                continue
+            if op == OP_OUTPUT:
+                t = 0
+                yield None
+                continue
+            if op == OP_END:
+                if pos != end:
+                    raise ValueError("trace 结束标记之后还有数据")
+                return
+            kinds = kinds_of.get(op)
+            if kinds is None:
+                raise ValueError(f"未知操作码：{op:#x}")
+            fields = []
+            for kind in kinds:
+                value = buf[pos]
+                if value < 0x80:
+                    pos += 1
+                else:
+                    value, pos = read_varint(buf, pos)
+                if kind == "F":
+                    value = value >> 1 if not value & 1 else -((value + 1) >> 1)
+                elif kind == "S":
+                    value = value / TICK_SCALE
+                fields.append(value)
+            yield t / TICK_SCALE, op, fields
+    except IndexError:
+        raise ValueError("trace 截断") from None
+    if version >= 2:
+        raise ValueError("trace 截断")
+
+
+def decode(buf):
+    """
+    解码二进制 trace，返回 (requests, events)：
+      - requests 为输入请求列表，操作码从 REQUEST_BASE 起；
+      - events 为输出段的迭代器，操作码与 checker7.OPCODES 一致，边解码边交给检查器，
+        不必一次性构造全部事件。
+    """
+    records = iter_records(buf)
+    requests = []
+    for record in records:
+        if record is None:
+            break
+        requests.append(record)
+    return requests, records
+
+
+def format_request(tick, op, fields, rules):
+    if op == REQUEST_BASE:
+        pid, priority, start, end = fields
+        return f"[{tick}]{pid}-PRI-{priority}-FROM-{rules.floor_name[start]}-TO-{rules.floor_name[end]}"
+    if op == REQUEST_BASE + 1:
+        eid, spd, floor = fields
+        return f"[{tick}]SCHE-{eid + 1}-{spd:g}-{rules.floor_name[floor]}"
+    a, b, floor = fields
+    return f"[{tick}]UPDATE-{a + 1}-{b + 1}-{rules.floor_name[floor]}"
+
+
+def to_text(buf, rules):
+    """二进制 trace -> (stdin 文本行, stdout 文本行)"""
+    requests, events = decode(buf)
+    stdin_lines = [r if isinstance(r, str) else format_request(*r, rules) for r in requests]
+    stdout_lines = [e if isinstance(e, str) else rules.format_event(*e) for e in events]
+    return stdin_lines, stdout_lines
+
+
+def load_trace(path, rules):
+    """供 checker7.py --trace 使用，见 read_trace"""
+    with open(path, "rb") as f:
+        return read_trace(f.read(), rules)
+
+
+def read_trace(buf, rules):
+    """
+    返回 (乘客, 输出事件)：
+      - 乘客为 Person 构造参数元组或 RAW 文本行，可直接交给 checker7.load_persons；
+      - 输出事件可直接交给 Checker.feed / Checker.feed_line。
+    """
+    requests, events = decode(buf)
+    persons = []
+    for r in requests:
+        if isinstance(r, str):
+            persons.append(r)
+        elif r[1] == REQUEST_BASE:
+            pid, priority, start, end = r[2]
+            persons.append((pid, priority, r[0], start, end))
+    return persons, events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="电梯评测 trace 的二进制编码与解码")
+    parser.add_argument('--spec', default=None,
+                        help="规则描述 JSON 文件，需与 checker7.py 所用一致")
+    sub = parser.add_subparsers(dest="command", required=True)
+    enc = sub.add_parser("encode", help="stdin.txt + stdout.txt -> 二进制 trace")
+    enc.add_argument('--stdin', default="stdin.txt")
+    enc.add_argument('--stdout', default="stdout.txt",
+                     help="程序输出，也可直接给 out.txt（[Log] 行会被忽略）")
+    enc.add_argument('-o', '--output', default="run.trc")
+    dec = sub.add_parser("decode", help="二进制 trace -> stdin.txt + stdout.txt")
+    dec.add_argument('trace')
+    dec.add_argument('--stdin', default="stdin.txt")
+    dec.add_argument('--stdout', default="stdout.txt")
+    args = parser.parse_args()
+    rules = Rules(load_spec(args.spec))
+
+    if args.command == "encode":
+        with open(args.stdin, "r", encoding="utf-8") as f:
+            stdin_lines = f.readlines()
+        with open(args.stdout, "r", encoding="utf-8", errors="replace") as f:
+            stdout_lines = f.readlines()
+        data = encode(stdin_lines, stdout_lines, rules)
+        with open(args.output, "wb") as f:
+            f.write(data)
+        size = sum(len(line.encode("utf-8")) for line in stdin_lines + stdout_lines)
+        print(f"{args.output}: {len(data)} 字节（文本 {size} 字节）", file=sys.stderr)
+    else:
+        with open(args.trace, "rb") as f:
+            stdin_lines, stdout_lines = to_text(f.read(), rules)
+        with open(args.stdin, "w", encoding="utf-8") as f:
+            f.writelines(line + "\n" for line in stdin_lines)
+        with open(args.stdout, "w", encoding="utf-8") as f:
+            f.writelines(line + "\n" for line in stdout_lines)
+
+
+if __name__ == "__main__":
+    main()